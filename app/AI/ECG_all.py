@@ -8,14 +8,22 @@ class ECG_AllPreprocessor:
         # 如果沒有傳入 server，會使用環境變數或預設值
         self.imgproc = ECGPreprocessor(fn, server)
         self.imgproc2 = ECG_STEMIPreprocessor(fn, server)
-        self.imgproc.__init__(fn, server=server)
-        self.imgproc2.__init__(fn, server=server)
 
-    def get_results(self, lang="en"):
-        img, txt, qa = self.imgproc.get_results()
-        _, txt2, qa2, forER_Alert = self.imgproc2.get_results()
+    def get_results(self, lang="en", render_image=True):
+        # 🚀 只有心律模型的圖會被使用，STEMI 模型只取推論結果，不重複繪圖
+        img, txt, qa = self.imgproc.get_results(render_image=render_image)
+        _, txt2, qa2, forER_Alert = self.imgproc2.get_results(render_image=False)
         return img, self.postprocess_text(txt, txt2), [qa, qa2], forER_Alert
 
+    @property
+    def wavedata(self):
+        """已解析的 12 導程波形，供報告畫布直接繪製"""
+        return self.imgproc.image
+
+    def render_image(self):
+        """推論後需要圖時再繪製 (get_results 使用 render_image=False 時)"""
+        return self.imgproc.postprocess_image()
+
     def postprocess_text(self, label1, label2):
         report_text = f"{label1}<br><br>"
         report_text += f"{label2}"
@@ -27,8 +35,8 @@ class QTPreprocessor:
         self.fn = fn  # 保存初始化時的 fn
         self.imgproc = ECG_QTPreprocessor(fn, server)
 
-    def get_results(self,lang="en"):
-        encode_image, report_text, raw_out, forER_Alert = self.imgproc.get_results()
+    def get_results(self, lang="en", render_image=True):
+        encode_image, report_text, raw_out, forER_Alert = self.imgproc.get_results(render_image=render_image)
         return encode_image,self.postprocess_text(report_text), raw_out,forER_Alert
     
     def postprocess_text(self, label1):
@@ -0,0 +1,59 @@
+import os
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+
+# 🚀 回應壓縮：FHIR JSON 與向量 ECG (svg / polyline) 是文字，gzip 後約小 4~10 倍
+#    (向量格式未壓縮只比 PNG 小約 2 倍，要靠壓縮才有數量級的差距)
+#    PNG / WebP / PDF 本身已壓縮，再 gzip 只浪費 CPU，直接略過；206 部分內容也不壓縮 (Range 以原始 bytes 計算)
+
+RESPONSE_GZIP = os.getenv("RESPONSE_GZIP", "1") == "1"
+RESPONSE_GZIP_MIN_BYTES = int(os.getenv("RESPONSE_GZIP_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/fhir+json",
+    "application/vnd.ecg.polyline+json",
+    "image/svg+xml",
+    "text/",
+)
+
+
+def is_compressible(content_type):
+    media_type = content_type.split(";")[0].strip().lower()
+    return any(
+        media_type.startswith(t) if t.endswith("/") else media_type == t
+        for t in COMPRESSIBLE_TYPES
+    )
+
+
+class _SelectiveGZipResponder(GZipResponder):
+    async def send_with_gzip(self, message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if (
+                message["status"] == 206
+                or "content-range" in headers
+                or not is_compressible(headers.get("content-type", ""))
+            ):
+                # 視同已有 Content-Encoding：GZipResponder 會原樣轉送
+                await super().send_with_gzip(message)
+                self.content_encoding_set = True
+                return
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                # 壓縮後的 bytes 與原始內容不同，強 ETag 改為弱 ETag (If-None-Match 以弱比對，仍可回 304)
+                MutableHeaders(raw=message["headers"])["ETag"] = f"W/{etag}"
+        await super().send_with_gzip(message)
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """只壓縮文字類型 (JSON / SVG) 回應的 GZipMiddleware"""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = _SelectiveGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
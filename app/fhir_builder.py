@@ -0,0 +1,253 @@
+import os
+import uuid
+
+import fhirclient.models.coding as Coding
+from fhirclient.models.fhirelementfactory import FHIRElementFactory
+import isodate
+import orjson
+
+from .fhir_templates import STEMI_DR_TEMPLATE, STEMI_OBS_TEMPLATE
+from .inference import STEMI_MODEL_VERSION
+from .terminology import NSR_LABEL, interpretation, rhythm_coding
+
+# 🚀 輸出的 DiagnosticReport / Observation 直接以 dict 組合並用 orjson 序列化
+#    不再經過 fhirclient 物件的逐欄位驗證與整個物件圖 (含 MB 級 base64 附件) 的 as_json()
+#    FHIR_BUILDER：
+#      dict       - 預設，dict + orjson
+#      fhirclient - 原本的 fhirclient 物件流程 (除錯用)
+#      verify     - 兩種都建立，比對排序後的 JSON bytes，不一致時印出警告並以 fhirclient 為準
+#    兩種流程輸出的 canonical JSON 等價 (鍵順序不同) 由 benchmarks/fhir_builder_check.py 在 CI 檢查，production 維持 dict 即可
+
+FHIR_BUILDER = os.getenv("FHIR_BUILDER", "dict")
+
+# 🚀 ServiceRequest / DiagnosticReport 的送出方式：
+#   separate    - 預設，先 POST SR 取得 id，推論完再 POST DR
+#   transaction - 推論完後以單一 transaction Bundle 一起送出 (一次往返、HAPI 單一資料庫交易)，
+#                 DR.basedOn 以 urn:uuid fullUrl 指向同一個 Bundle 內的 SR
+FHIR_SUBMIT_MODE = os.getenv("FHIR_SUBMIT_MODE", "separate")
+
+
+verify_mismatches = 0
+
+
+def fhir_datetime(value):
+    """與 fhirclient FHIRDate.isostring 相同的時間格式"""
+    return isodate.datetime_isoformat(value)
+
+
+def dumps(resource):
+    return orjson.dumps(resource)
+
+
+def canonical_bytes(resource):
+    """排序鍵後的 JSON bytes，用於比對兩種建構方式"""
+    return orjson.dumps(resource, option=orjson.OPT_SORT_KEYS)
+
+
+def stemi_observation_json(raw_out, stemi_sigmoid, stemi_display_prob, report):
+    """以 dict 組合 STEMI Observation (coding / interpretation 直接查 terminology 的預建片段)"""
+    obs = STEMI_OBS_TEMPLATE.json()
+    stemi, rhythm = obs["component"]
+
+    stemi["interpretation"] = interpretation(stemi_sigmoid >= 0.5)
+    stemi["valueQuantity"]["value"] = float(f"{stemi_display_prob:.2f}")
+
+    disease = [i for i in raw_out.keys() if i != "STEMI"][0]
+    rhythm["code"]["coding"] = rhythm_coding(disease)
+    if disease != NSR_LABEL:
+        rhythm["interpretation"] = interpretation(raw_out[disease] >= 0.5)
+        rhythm["valueQuantity"]["value"] = float(raw_out[disease] * 100)
+    else:
+        rhythm["interpretation"] = interpretation(False)
+        rhythm["valueQuantity"]["value"] = float(f"{raw_out[disease] * 100:.2f}")
+
+    obs["note"][0]["text"] = report.replace("<br>", "\n")
+    return obs
+
+
+def stemi_projection(raw_out, stemi_sigmoid):
+    """Resources 的型別化投影欄位 (與 Observation 同一份推論結果)"""
+    disease = [i for i in raw_out.keys() if i != "STEMI"][0]
+    return {
+        "stemi_prob": float(stemi_sigmoid),
+        "interpretation_code": "A" if stemi_sigmoid >= 0.5 else "N",
+        "rhythm_label": disease,
+        "rhythm_prob": float(raw_out[disease]),
+        "model_version": STEMI_MODEL_VERSION,
+    }
+
+
+def stemi_observation_model(raw_out, stemi_sigmoid, stemi_display_prob, report):
+    """原本的 fhirclient 物件流程 (FHIR_BUILDER=fhirclient / verify)"""
+    obs = STEMI_OBS_TEMPLATE()
+
+    obs.component[0].interpretation[0].coding[0].code = (
+        "A" if stemi_sigmoid >= 0.5 else "N"
+    )
+    obs.component[0].interpretation[0].coding[0].display = (
+        "Abnormal" if stemi_sigmoid >= 0.5 else "Normal"
+    )
+    obs.component[0].valueQuantity.value = float(f"{stemi_display_prob:.2f}")
+
+    disease = [i for i in raw_out.keys() if i != "STEMI"][0]
+    if disease != "NSR":
+        obs.component[1].code.coding = [Coding.Coding(coding) for coding in rhythm_coding(disease)]
+        obs.component[1].interpretation[0].coding[0].code = (
+            "A" if raw_out[disease] >= 0.5 else "N"
+        )
+        obs.component[1].interpretation[0].coding[0].display = (
+            "Abnormal" if raw_out[disease] >= 0.5 else "Normal"
+        )
+        obs.component[1].valueQuantity.value = raw_out[disease] * 100
+    else:
+        obs.component[1].code.coding[0].code = "LA25095-3"
+        obs.component[1].code.coding[0].display = "Normal Sinus Rhythm (RSR)"
+        obs.component[1].interpretation[0].coding[0].code = "N"
+        obs.component[1].interpretation[0].coding[0].display = "Normal"
+        obs.component[1].valueQuantity.value = float(
+            f"{raw_out[disease] * 100:.2f}"
+        )
+
+    obs.note[0].text = report.replace("<br>", "\n")
+    return obs
+
+
+def _verified(label, fast, slow):
+    """verify 模式：比對兩種建構結果，不一致時以 fhirclient 為準"""
+    global verify_mismatches
+    if canonical_bytes(fast) != canonical_bytes(slow):
+        verify_mismatches += 1
+        print(f"⚠️  FHIR_BUILDER verify: {label} 與 fhirclient 輸出不一致")
+        return slow
+    return fast
+
+
+def build_stemi_observation(raw_out, stemi_sigmoid, stemi_display_prob, report):
+    """依 FHIR_BUILDER 建立 Observation，一律回傳 dict"""
+    args = (raw_out, stemi_sigmoid, stemi_display_prob, report)
+    if FHIR_BUILDER == "fhirclient":
+        return stemi_observation_model(*args).as_json()
+    obs = stemi_observation_json(*args)
+    if FHIR_BUILDER == "verify":
+        return _verified("Observation", obs, stemi_observation_model(*args).as_json())
+    return obs
+
+
+def attachment_json(content_type, data, title=None):
+    att = {"contentType": content_type, "data": data}
+    if title:
+        att["title"] = title
+    return att
+
+
+def stemi_report_json():
+    """由模板建立新的 DiagnosticReport dict"""
+    return STEMI_DR_TEMPLATE.json()
+
+
+def finalize_report(dr, obs, attachments, issued):
+    """填入結果：contained Observation、附件與發出時間"""
+    dr["contained"] = [obs]
+    dr["result"] = [{"reference": f"#{obs['id']}"}]
+    dr["presentedForm"] = attachments
+    dr["issued"] = fhir_datetime(issued)
+    dr["status"] = "final"
+    dr.pop("text", None)
+    dr.pop("conclusion", None)
+    return dr
+
+
+def fail_report(dr, conclusion, issued):
+    dr["issued"] = fhir_datetime(issued)
+    dr["status"] = "entered-in-error"
+    dr["conclusion"] = conclusion
+    return dr
+
+
+def prepare_resource(resource):
+    """依 FHIR_BUILDER 決定實際送出的 dict (fhirclient / verify 會先經過 fhirclient 物件)"""
+    if FHIR_BUILDER == "fhirclient":
+        return FHIRElementFactory.instantiate(resource["resourceType"], resource).as_json()
+    if FHIR_BUILDER == "verify":
+        # 經 fhirclient 物件驗證後再序列化，內容必須一致
+        model_json = FHIRElementFactory.instantiate(resource["resourceType"], resource).as_json()
+        return _verified(resource["resourceType"], resource, model_json)
+    return resource
+
+
+async def create_resource(client, resource):
+    """POST 資源 dict 到 FHIR server (AsyncFHIRClient)，回傳 response JSON"""
+    return await client.create(prepare_resource(resource))
+
+
+def new_full_url():
+    """transaction Bundle 內暫時的資源識別 (server 會改寫為實際的 Type/id)"""
+    return f"urn:uuid:{uuid.uuid4()}"
+
+
+def transaction_bundle(entries):
+    """[(fullUrl, resource dict), ...] → transaction Bundle，每筆都是 POST 建立"""
+    return {
+        "resourceType": "Bundle",
+        "type": "transaction",
+        "entry": [
+            {
+                "fullUrl": full_url,
+                "resource": resource,
+                "request": {"method": "POST", "url": resource["resourceType"]},
+            }
+            for full_url, resource in entries
+        ],
+    }
+
+
+def location_id(location):
+    """'ServiceRequest/123/_history/1' (可能是絕對網址) → '123'"""
+    parts = location.rstrip("/").split("/")
+    if "_history" in parts:
+        return parts[parts.index("_history") - 1]
+    return parts[-1]
+
+
+def _resolve_references(value, references):
+    """把 Reference.reference 的 urn:uuid 換成 server 指派的 Type/id (與 server 端的改寫一致)"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == "reference" and item in references:
+                value[key] = references[item]
+            else:
+                _resolve_references(item, references)
+    elif isinstance(value, list):
+        for item in value:
+            _resolve_references(item, references)
+
+
+async def submit_transaction(client, entries):
+    """以單一 transaction Bundle 建立多個資源 (AsyncFHIRClient)
+
+    entries 為 [(fullUrl, resource dict), ...]，送出前各自經過 prepare_resource；
+    依 transaction-response 的 location 補上 id / meta 並改寫 urn:uuid 參照，
+    回傳 (id 清單, 實際送出的資源 dict 清單)，順序與 entries 相同
+    """
+    entries = [(full_url, prepare_resource(resource)) for full_url, resource in entries]
+    resp = await client.transaction(transaction_bundle(entries))
+
+    ids, references = [], {}
+    for (full_url, resource), entry in zip(entries, resp["entry"]):
+        result = entry["response"]
+        resource_id = location_id(result["location"])
+        resource["id"] = resource_id
+        meta = {}
+        if result.get("etag"):
+            # ETag 形式為 W/"1"
+            meta["versionId"] = result["etag"].split('"')[1] if '"' in result["etag"] else result["etag"]
+        if result.get("lastModified"):
+            meta["lastUpdated"] = result["lastModified"]
+        if meta:
+            resource["meta"] = {**resource.get("meta", {}), **meta}
+        references[full_url] = f"{resource['resourceType']}/{resource_id}"
+        ids.append(resource_id)
+
+    for _, resource in entries:
+        _resolve_references(resource, references)
+    return ids, [resource for _, resource in entries]
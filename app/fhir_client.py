@@ -0,0 +1,96 @@
+from urllib.parse import urljoin
+import os
+
+import httpx
+import orjson
+
+# 🚀 非同步 FHIR client：所有請求共用一個 httpx.AsyncClient (連線池 + keep-alive，可選 HTTP/2)
+#    async handler 內不再以同步 requests 呼叫 HAPI 而阻塞事件迴圈
+#    資源一律以 dict 進出，序列化用 orjson
+
+FHIR_MAX_CONNECTIONS = int(os.getenv("FHIR_MAX_CONNECTIONS", "20"))
+FHIR_MAX_KEEPALIVE = int(os.getenv("FHIR_MAX_KEEPALIVE", "10"))
+FHIR_TIMEOUT = float(os.getenv("FHIR_TIMEOUT", "30"))
+# HTTP/2 需要安裝 h2 套件 (pip install httpx[http2])，未安裝時自動退回 HTTP/1.1
+FHIR_HTTP2 = os.getenv("FHIR_HTTP2", "0") == "1"
+
+FHIR_JSON_MIME = "application/fhir+json"
+_HEADERS = {
+    "Accept": FHIR_JSON_MIME,
+    "Accept-Charset": "UTF-8",
+}
+_BODY_HEADERS = {**_HEADERS, "Content-Type": FHIR_JSON_MIME}
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        print("⚠️  FHIR_HTTP2=1 但未安裝 h2，改用 HTTP/1.1")
+        return False
+
+
+class AsyncFHIRClient:
+    """長期存活的 FHIR REST client (create / read / update / search / transaction)"""
+
+    def __init__(self, base_uri, http2=FHIR_HTTP2, max_connections=FHIR_MAX_CONNECTIONS,
+                 max_keepalive=FHIR_MAX_KEEPALIVE, timeout=FHIR_TIMEOUT):
+        self.base_uri = base_uri if base_uri.endswith("/") else base_uri + "/"
+        self.http2 = http2
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.timeout = timeout
+        self._client = None
+
+    @property
+    def client(self):
+        """第一次使用時才建立 (需在事件迴圈內)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_uri,
+                http2=self.http2 and _http2_available(),
+                limits=self.limits,
+                timeout=self.timeout,
+            )
+        return self._client
+
+    async def _request(self, method, path, resource=None, params=None):
+        res = await self.client.request(
+            method,
+            path,
+            content=orjson.dumps(resource) if resource is not None else None,
+            params=params,
+            headers=_BODY_HEADERS if resource is not None else _HEADERS,
+        )
+        res.raise_for_status()
+        return orjson.loads(res.content) if res.content else None
+
+    def url(self, path):
+        """資源的絕對網址"""
+        return urljoin(self.base_uri, path)
+
+    async def create(self, resource):
+        return await self._request("POST", resource["resourceType"], resource)
+
+    async def read(self, resource_type, resource_id):
+        return await self._request("GET", f"{resource_type}/{resource_id}")
+
+    async def read_url(self, url):
+        """以相對或絕對網址讀取 (例如 Attachment.url 指向的 Binary)"""
+        return await self._request("GET", url)
+
+    async def update(self, resource):
+        return await self._request("PUT", f"{resource['resourceType']}/{resource['id']}", resource)
+
+    async def search(self, resource_type, params=None):
+        """回傳 searchset Bundle"""
+        return await self._request("GET", resource_type, params=params)
+
+    async def transaction(self, bundle):
+        """POST transaction / batch Bundle 到 server 根路徑，回傳 transaction-response Bundle"""
+        return await self._request("POST", "", bundle)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -5,17 +5,19 @@ import os
 os.environ.setdefault("PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION", "python")
 
 try:
-    from .stemi import inference as stemiInf, STEMI_ICD_DICT
+    from .stemi import inference as stemiInf, STEMIResult, STEMI_ICD_DICT, STEMI_MODEL_VERSION
 except ImportError as e:
     # 如果相對導入失敗，嘗試絕對導入
     try:
-        from app.inference.stemi import inference as stemiInf, STEMI_ICD_DICT
+        from app.inference.stemi import inference as stemiInf, STEMIResult, STEMI_ICD_DICT, STEMI_MODEL_VERSION
     except ImportError:
         # 如果都失敗，提供錯誤信息
         import warnings
         warnings.warn(f"Cannot import stemiInf and STEMI_ICD_DICT: {e}")
         stemiInf = None
+        STEMIResult = None
         STEMI_ICD_DICT = None
+        STEMI_MODEL_VERSION = None
 
 # 確保導出到模組命名空間
-__all__ = ['stemiInf', 'STEMI_ICD_DICT']
+__all__ = ['stemiInf', 'STEMIResult', 'STEMI_ICD_DICT', 'STEMI_MODEL_VERSION']
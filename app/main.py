@@ -8,9 +8,10 @@ from sqlmodel import select
 from datetime import timedelta, datetime
 import time
 import httpx
-import json
+import orjson
 
-from .models import get_session, Account,base_engine
+from .compression import RESPONSE_GZIP, RESPONSE_GZIP_LEVEL, RESPONSE_GZIP_MIN_BYTES, SelectiveGZipMiddleware
+from .models import get_session, Account,base_engine, migrate_resources
 # from .CTCAE_models import ctcae_engine,database_name,ctcae_metadata  # 暫時註解
 from .JWT import (
     verify_password,
@@ -20,11 +21,13 @@ from .JWT import (
     change_password,
 )
 from .routers import STEMI, admin
+from .rendering.service import render_service
+from .fhir_processor import fhir_client
 # from .routers import Ekghome, iSEPS, iAST, iASTv2, sepsis
 # from .routers import CAD, CTCAE,ARDS,iIDeAS,NCCT,ARDS_infiltrate,PressureInjury,ICH,FlapDet,ARDS_new
 
 from sqlmodel import SQLModel
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
 import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
@@ -32,7 +35,8 @@ import asyncpg
 import logging
 
 
-app = FastAPI(root_path='/api/')  # root_path='/api/'
+# 🚀 預設以 orjson 序列化回應
+app = FastAPI(root_path='/api/', default_response_class=ORJSONResponse)  # root_path='/api/'
 app.include_router(STEMI.router)
 app.include_router(admin.router)
 # 其他路由器暫時註解，因為只有 STEMI 功能
@@ -62,6 +66,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 🚀 JSON / SVG / polyline 回應 gzip 壓縮 (已壓縮的 PNG / WebP / PDF 不處理)，見 app/compression.py
+if RESPONSE_GZIP:
+    app.add_middleware(
+        SelectiveGZipMiddleware, minimum_size=RESPONSE_GZIP_MIN_BYTES, compresslevel=RESPONSE_GZIP_LEVEL
+    )
+
 # 🚀 增強的中間件：記錄日誌並發送到 audit logger
 @app.middleware("http")
 async def add_logwging(request: Request, call_next):
@@ -110,7 +120,7 @@ async def send_audit_log(request: Request, response, process_time: float):
         }
         
         # 🔧 轉換為 JSON 字串發送（符合 logger 的 await request.body() 預期）
-        log_json_string = json.dumps(log_data, ensure_ascii=False)
+        log_json_string = orjson.dumps(log_data)
         
         # 異步發送到 audit logger
         async with httpx.AsyncClient() as client:
@@ -133,7 +143,7 @@ async def root():
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal Server Error", "error": str(exc)}
     )
@@ -276,6 +286,10 @@ async def init_main_database():
                 # 如果檢查失敗，可能是表格不存在，直接創建
                 await conn.run_sync(SQLModel.metadata.create_all)
                 print("主要資料庫資料表創建成功")
+
+        # 🚀 舊表格補上投影欄位、索引與 JSONB
+        async with base_engine.begin() as conn:
+            await migrate_resources(conn)
                 
     except Exception as e:
         print(f"主要資料庫初始化失敗: {e}")
@@ -302,3 +316,11 @@ async def on_startup():
     #         await conn.run_sync(ctcae_metadata.create_all)
     # except Exception as e:
     #     print(f"CTCAE 資料庫初始化失敗 (可忽略): {e}")
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # 關閉繪圖 process pool
+    render_service.shutdown()
+    # 關閉 FHIR 連線池
+    await fhir_client.aclose()
@@ -1,13 +1,15 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
-from sqlmodel import JSON, Column, Integer
+from sqlalchemy import Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import Column, Integer
 from sqlalchemy.ext.asyncio.engine import create_async_engine
 from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional, Dict, AsyncGenerator
 from sqlmodel import SQLModel, Field
 import pandas as pd
 from datetime import datetime
-import json
+import orjson
 import os
 import logging
 from pymongo import MongoClient, errors
@@ -22,10 +24,19 @@ MONGO_BACKUPURI = os.environ.get("MONGO_BACKUPURI", "10.65.51.237:27017")
 MONGO_DATABASE = os.environ.get("mongodb131name", "FHIR")
 MONGO_COLLECTION = os.environ.get("mongodb131coletion", "resources")
 
+# resources.result 欄位的 TOAST 壓縮方式 (PostgreSQL 14+：pglz / lz4，空字串 = 不變更)
+RESOURCES_RESULT_COMPRESSION = os.environ.get("RESOURCES_RESULT_COMPRESSION", "").strip().lower()
+
+def _json_serializer(value):
+    """JSON 欄位以 orjson 序列化 (與 ensure_ascii=False 相同，中文不跳脫)"""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
 # 創建資料庫引擎
 base_engine = create_async_engine(
     sqlite_url,
-    json_serializer=lambda x: json.dumps(x, ensure_ascii=False),
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
 )
 
 # 資料庫會話生成器
@@ -47,16 +58,92 @@ class Account(SQLModel, table=True):
 
 class Resources(SQLModel, table=True):
     """FHIR 資源記錄表"""
+    # 🚀 儀表板查詢 (依時間區間 / 判讀結果統計) 走索引，不必掃描並解析 result
+    __table_args__ = (
+        Index("ix_resources_create_time", "create_time"),
+        Index("ix_resources_interpretation_create_time", "interpretation_code", "create_time"),
+    )
+
     res_id: int = Field(primary_key=True)
     res_type: str
     user: str
     requester: str
     model: str
     status: str
-    result: Optional[Dict] = Field(sa_column=Column(JSON))
+    # 完整 Observation 保留在 JSONB，只供細部查詢
+    result: Optional[Dict] = Field(sa_column=Column(JSONB))
     create_time: datetime
     update_time: Optional[datetime]
-    self_id: int 
+    self_id: int
+    # 寫入時由推論結果投影出的型別化欄位 (機率皆為 0~1)
+    stemi_prob: Optional[float] = Field(default=None, index=True)
+    interpretation_code: Optional[str] = Field(default=None, index=True)  # A / N
+    rhythm_label: Optional[str] = Field(default=None, index=True)  # 模型標籤，例如 AFIB / NSR
+    rhythm_prob: Optional[float] = None
+    model_version: Optional[str] = None
+
+
+# 既有的 resources 表格補上投影欄位與索引 (可重複執行)
+RESOURCES_MIGRATIONS = (
+    "ALTER TABLE resources ADD COLUMN IF NOT EXISTS stemi_prob DOUBLE PRECISION",
+    "ALTER TABLE resources ADD COLUMN IF NOT EXISTS interpretation_code VARCHAR",
+    "ALTER TABLE resources ADD COLUMN IF NOT EXISTS rhythm_label VARCHAR",
+    "ALTER TABLE resources ADD COLUMN IF NOT EXISTS rhythm_prob DOUBLE PRECISION",
+    "ALTER TABLE resources ADD COLUMN IF NOT EXISTS model_version VARCHAR",
+    "CREATE INDEX IF NOT EXISTS ix_resources_stemi_prob ON resources (stemi_prob)",
+    "CREATE INDEX IF NOT EXISTS ix_resources_interpretation_code ON resources (interpretation_code)",
+    "CREATE INDEX IF NOT EXISTS ix_resources_rhythm_label ON resources (rhythm_label)",
+    "CREATE INDEX IF NOT EXISTS ix_resources_create_time ON resources (create_time)",
+    "CREATE INDEX IF NOT EXISTS ix_resources_interpretation_create_time ON resources (interpretation_code, create_time)",
+)
+
+
+# 多個 uvicorn worker 同時啟動時，以 advisory lock 讓 migration 依序執行 (任意固定的 64-bit 鍵)
+RESOURCES_MIGRATION_LOCK = 0x5354454D49  # "STEMI"
+_COMPRESSION_CODES = {"pglz": "p", "lz4": "l"}
+
+
+async def migrate_resources(conn):
+    """舊版 resources：result 由 JSON 轉為 JSONB，並建立投影欄位與索引
+
+    conn 需在交易內 (engine.begin())：交易層級的 advisory lock 在 commit 時釋放，
+    其他 worker 等到前一個完成後再檢查，看到已是 jsonb 就不會重寫表格
+    """
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": RESOURCES_MIGRATION_LOCK})
+    result = await conn.execute(text("""
+        SELECT data_type
+        FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'resources' AND column_name = 'result'
+    """))
+    data_type = result.scalar()
+    if data_type == "json":
+        # 只在第一次轉換時重寫表格
+        await conn.execute(text("ALTER TABLE resources ALTER COLUMN result TYPE JSONB USING result::jsonb"))
+        print("resources.result 已轉換為 JSONB")
+    for statement in RESOURCES_MIGRATIONS:
+        await conn.execute(text(statement))
+    if RESOURCES_RESULT_COMPRESSION and RESOURCES_RESULT_COMPRESSION not in _COMPRESSION_CODES:
+        # 只接受白名單中的方法，不把環境變數原樣組進 SQL
+        print(
+            f"⚠️  未知的 RESOURCES_RESULT_COMPRESSION: {RESOURCES_RESULT_COMPRESSION!r}"
+            f" (可用: {', '.join(_COMPRESSION_CODES)})，略過壓縮設定"
+        )
+    elif RESOURCES_RESULT_COMPRESSION:
+        # 只影響之後寫入的資料；PostgreSQL 14 以下不支援時略過
+        try:
+            async with conn.begin_nested():
+                # 已是目標設定時略過 (ALTER TABLE 需要 ACCESS EXCLUSIVE lock)
+                current = (await conn.execute(text(
+                    "SELECT attcompression FROM pg_attribute "
+                    "WHERE attrelid = 'resources'::regclass AND attname = 'result'"
+                ))).scalar()
+                if current != _COMPRESSION_CODES[RESOURCES_RESULT_COMPRESSION]:
+                    await conn.execute(text(
+                        f"ALTER TABLE resources ALTER COLUMN result SET COMPRESSION {RESOURCES_RESULT_COMPRESSION}"
+                    ))
+        except Exception as e:
+            print(f"resources.result 壓縮設定失敗: {e}")
+
 
 class hospital_info(SQLModel, table=True):
     """醫院資訊表"""
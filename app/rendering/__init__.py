@@ -0,0 +1,52 @@
+import os
+
+from .geometry import stack_leads
+from .layout import LAYOUTS, EcgLayout, LeadSlot, get_layout
+from .shm import WaveformArena, WaveformHandle, attach
+from .vector import (
+    OUTPUT_FORMATS, REPORT_FORMAT, encode_vector, render_ecg_polyline, render_ecg_svg, select_format,
+)
+
+# 🚀 依部署選擇 ECG renderer：matplotlib (預設) 或 raster (numpy + Pillow，不載入 matplotlib)
+ECG_RENDERER = os.getenv("ECG_RENDERER", "matplotlib")
+
+
+def get_renderer(name=None):
+    """取得 ECG renderer 模組 (延遲匯入，raster 模式不會載入 matplotlib)"""
+    name = name or ECG_RENDERER
+    if name == "raster":
+        from . import raster
+        return raster
+    if name == "matplotlib":
+        from . import ecg
+        return ecg
+    raise ValueError(f"未知的 ECG_RENDERER: {name}")
+
+
+def render_ecg_png(wavedata, layout=None):
+    """繪製 ECG 並回傳 PNG bytes"""
+    return get_renderer().render_ecg_png(wavedata, layout=layout)
+
+
+def render_ecg_base64(wavedata, layout=None):
+    """繪製 ECG 並回傳 base64 字串，可直接顯示於網頁"""
+    return get_renderer().render_ecg_base64(wavedata, layout=layout)
+
+
+from .codecs import PROFILES, REPORT_IMAGE_PROFILE, EncodedImage, encode_image, select_profile
+from .report import (
+    REPORT_RENDITIONS, RENDITIONS, ReportPage, compose_renditions, compose_report, encode_png, layout_report,
+    render_renditions, render_report, render_report_formats, render_report_pdf, render_report_png,
+)
+
+__all__ = [
+    'ECG_RENDERER', 'get_renderer', 'render_ecg_png', 'render_ecg_base64', 'stack_leads',
+    'LAYOUTS', 'EcgLayout', 'LeadSlot', 'get_layout',
+    'WaveformArena', 'WaveformHandle', 'attach',
+    'OUTPUT_FORMATS', 'REPORT_FORMAT', 'encode_vector', 'render_ecg_polyline', 'render_ecg_svg',
+    'select_format',
+    'PROFILES', 'REPORT_IMAGE_PROFILE', 'EncodedImage', 'encode_image', 'select_profile',
+    'REPORT_RENDITIONS', 'RENDITIONS', 'compose_renditions', 'compose_report', 'encode_png',
+    'render_renditions', 'render_report', 'render_report_png',
+    'ReportPage', 'layout_report', 'render_report_formats', 'render_report_pdf',
+]
@@ -0,0 +1,82 @@
+import os
+import numpy as np
+
+# 🚀 依輸出像素抽點：150 dpi 下每個像素欄約有 3~5 個取樣點，全部送進 rasterizer 是浪費
+#    - minmax：每個像素欄只保留最小與最大值 (依原本順序)，繪出的折線與全解析度誤差在 1 像素內
+#    - lttb：Largest-Triangle-Three-Buckets，每個像素欄保留 1 點，頂點更少但可能削掉尖峰
+#    - none：不抽點
+
+ECG_DECIMATION = os.getenv("ECG_DECIMATION", "minmax")
+
+METHODS = ("none", "minmax", "lttb")
+
+
+def samples_per_pixel(sample_spacing_mm, px_per_mm):
+    """每個像素欄涵蓋的取樣點數"""
+    return 1.0 / (sample_spacing_mm * px_per_mm)
+
+
+def minmax_indices(y, bucket):
+    """每 bucket 個取樣點保留最小與最大值的索引 (向量化)，頭尾點一定保留"""
+    n = len(y)
+    bucket = int(bucket)
+    if bucket < 3 or n <= bucket:
+        # 每欄不到 3 點時保留 2 點沒有效益
+        return np.arange(n)
+    m = n // bucket * bucket
+    blocks = y[:m].reshape(-1, bucket)
+    imin = blocks.argmin(1)
+    imax = blocks.argmax(1)
+    base = np.arange(len(blocks)) * bucket
+    idx = np.stack([base + np.minimum(imin, imax), base + np.maximum(imin, imax)], 1).ravel()
+    return np.unique(np.concatenate([[0], idx, np.arange(m, n), [n - 1]]))
+
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets：選出 threshold 個視覺上最重要的點"""
+    n = len(y)
+    threshold = int(threshold)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # 中間的點平均分成 threshold - 2 個 bucket，頭尾點固定保留
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # 下一個 bucket 的平均點可以事先一次算好
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(sums_x / counts, x[n - 1])
+    avg_y = np.append(sums_y / counts, y[n - 1])
+
+    # 每個 bucket 只有幾個點，內層用純 Python 比逐 bucket 呼叫 numpy 快
+    xs = x.tolist()
+    ys = y.tolist()
+    bounds = edges.tolist()
+    next_x = avg_x[1:].tolist()
+    next_y = avg_y[1:].tolist()
+    idx = [0]
+    a = 0
+    for i in range(threshold - 2):
+        ax, ay, cx, cy = xs[a], ys[a], next_x[i], next_y[i]
+        best, best_area = bounds[i], -1.0
+        for j in range(bounds[i], bounds[i + 1]):
+            # 三角形 (已選點, 候選點, 下一 bucket 平均點) 的面積 (省略常數 1/2)
+            area = abs((ax - cx) * (ys[j] - ay) - (ax - xs[j]) * (cy - ay))
+            if area > best_area:
+                best, best_area = j, area
+        a = best
+        idx.append(a)
+    idx.append(n - 1)
+    return np.array(idx)
+
+
+def decimate(points, sample_spacing_mm, px_per_mm, method=None):
+    """依輸出解析度抽點，points 為 (n, 2) mm 座標且 x 等間距"""
+    method = method or ECG_DECIMATION
+    if method == "none":
+        return points
+    per_px = samples_per_pixel(sample_spacing_mm, px_per_mm)
+    if method == "minmax":
+        return points[minmax_indices(points[:, 1], per_px)]
+    if method == "lttb":
+        return points[lttb_indices(points[:, 0], points[:, 1], len(points) / per_px)]
+    raise ValueError(f"未知的 ECG_DECIMATION: {method}")
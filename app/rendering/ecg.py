@@ -0,0 +1,125 @@
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.patches import PathPatch
+from matplotlib.path import Path
+from matplotlib.textpath import TextPath
+from PIL import Image
+from functools import lru_cache
+import numpy as np
+import base64
+from io import BytesIO
+
+from .geometry import (
+    X_MM, Y_MM, M_X_INCH, M_Y_INCH, THIN_WIDTH, FAT_WIDTH, DPI, PAD_INCH,
+)
+from .layout import get_layout
+
+# 🚀 執行緒安全：只使用 Figure + FigureCanvasAgg 物件，不經過 pyplot 的全域 figure 註冊表
+#    每次呼叫都建立自己的 Figure，可以安全地在多個執行緒中同時執行
+
+# 格線：一條垂直 LineCollection + 一條水平 LineCollection 取代 397 次 axvline/axhline
+_GRID_X = np.arange(X_MM)
+_GRID_Y = np.arange(Y_MM)
+_GRID_V_SEGMENTS = np.stack(
+    [
+        np.stack([_GRID_X, np.full(X_MM, -0.5)], -1),
+        np.stack([_GRID_X, np.full(X_MM, Y_MM - 0.5)], -1),
+    ],
+    1,
+)
+_GRID_H_SEGMENTS = np.stack(
+    [
+        np.stack([np.full(Y_MM, -0.5), _GRID_Y], -1),
+        np.stack([np.full(Y_MM, X_MM - 0.5), _GRID_Y], -1),
+    ],
+    1,
+)
+
+
+def _grid_widths(n):
+    widths = np.where(np.arange(n) % 5 == 0, FAT_WIDTH, THIN_WIDTH)
+    widths[-1] = FAT_WIDTH
+    return widths
+
+
+_GRID_V_WIDTHS = _grid_widths(X_MM)
+_GRID_H_WIDTHS = _grid_widths(Y_MM)
+
+# 導程標籤：18pt 字型轉成 mm 後合併成單一 compound path，一次繪製
+LABEL_FONT_MM = 18 / 72 * 25.4
+_LABEL_ASCENT = TextPath((0, 0), "lp", size=LABEL_FONT_MM).get_extents().y1
+
+
+@lru_cache(maxsize=None)
+def _label_path(layout):
+    """每種版面的標籤路徑只建立一次"""
+    return Path.make_compound_path(
+        *[
+            TextPath((x, y - _LABEL_ASCENT), label, size=LABEL_FONT_MM)
+            for label, (x, y) in zip(layout.labels, layout.label_positions)
+        ]
+    )
+
+
+def render_ecg_figure(wavedata, dpi=DPI, layout=None):
+    """在獨立的 Figure 上繪製 12 導程 ECG，回傳 Figure (不使用 pyplot)"""
+    # 白邊直接放進 Figure 尺寸，等同 bbox_inches="tight" 的結果，但不需要額外的 tight bbox 繪製
+    fig_w = M_X_INCH + 2 * PAD_INCH
+    fig_h = M_Y_INCH + 2 * PAD_INCH
+    f = Figure(figsize=(fig_w, fig_h), dpi=dpi)
+    FigureCanvasAgg(f)
+    axes = f.add_axes(
+        (PAD_INCH / fig_w, PAD_INCH / fig_h, M_X_INCH / fig_w, M_Y_INCH / fig_h),
+        frame_on=False,
+    )
+    axes.set_xlim(-0.5, X_MM - 0.5)
+    axes.set_ylim(-0.5, Y_MM - 0.5)
+    axes.set_xticks([])
+    axes.set_yticks([])
+
+    axes.add_collection(
+        LineCollection(_GRID_V_SEGMENTS, linewidths=_GRID_V_WIDTHS, colors="red"),
+        autolim=False,
+    )
+    axes.add_collection(
+        LineCollection(_GRID_H_SEGMENTS, linewidths=_GRID_H_WIDTHS, colors="red"),
+        autolim=False,
+    )
+    layout = get_layout(layout)
+    axes.add_collection(
+        LineCollection(
+            layout.segments(wavedata, px_per_mm=dpi / 25.4), linewidths=0.5, colors="black"
+        ),
+        autolim=False,
+    )
+    axes.add_patch(PathPatch(_label_path(layout), facecolor="black", edgecolor="none"))
+
+    axes.axis("off")
+    return f
+
+
+def render_ecg_image(wavedata, dpi=DPI, layout=None):
+    """繪製 ECG 並回傳 PIL Image (RGB)，不經過 PNG 編解碼"""
+    f = render_ecg_figure(wavedata, dpi, layout)
+    f.canvas.draw()
+    rgba = np.asarray(f.canvas.buffer_rgba())
+    return Image.fromarray(rgba[..., :3], "RGB")
+
+
+def draw_ecg(canvas, wavedata, origin=(0, 0), dpi=DPI, layout=None):
+    """將 ECG 直接繪製到既有的 PIL 畫布上"""
+    canvas.paste(render_ecg_image(wavedata, dpi, layout), origin)
+
+
+def render_ecg_png(wavedata, dpi=DPI, layout=None):
+    """繪製 ECG 並回傳 PNG bytes"""
+    f = render_ecg_figure(wavedata, dpi, layout)
+    png_bytes = BytesIO()
+    f.savefig(png_bytes, dpi=dpi, format="png")
+    return png_bytes.getvalue()
+
+
+def render_ecg_base64(wavedata, dpi=DPI, layout=None):
+    """繪製 ECG 並回傳 base64 字串，可直接顯示於網頁"""
+    return base64.b64encode(render_ecg_png(wavedata, dpi, layout)).decode()
@@ -0,0 +1,33 @@
+import numpy as np
+
+# 🚀 ECG 紙張幾何：不依賴 matplotlib，供各種 renderer 共用
+
+# ECG 紙張尺寸 (mm)
+X_MM = 268
+Y_MM = 129
+M_X_INCH = float(X_MM) / 25.4
+M_Y_INCH = float(Y_MM) / 25.4
+THIN_WIDTH = 0.04
+FAT_WIDTH = 0.2
+DPI = 150
+# savefig(bbox_inches="tight") 預設的白邊 (inch)
+PAD_INCH = 0.1
+
+# 波形緩衝區 (N, 12) 的欄位順序
+LEAD_ORDER = ["I", "II", "III", "AVR", "AVL", "AVF", "V1", "V2", "V3", "V4", "V5", "V6"]
+LEAD_INDEX = {lead: i for i, lead in enumerate(LEAD_ORDER)}
+
+# 10 秒 @ 500 Hz 的完整波形長度
+RHYTHM_SAMPLES = 5000
+
+
+def dpi_for_width(width_px):
+    """計算讓輸出 (含白邊) 剛好為指定寬度的 dpi"""
+    return width_px / (M_X_INCH + 2 * PAD_INCH)
+
+
+def stack_leads(wavedata):
+    """將導程字典轉為 (N, 12) 波形緩衝區，欄位順序依 LEAD_ORDER"""
+    if isinstance(wavedata, np.ndarray):
+        return wavedata
+    return np.stack([wavedata[lead] for lead in LEAD_ORDER], -1)
@@ -0,0 +1,84 @@
+"""
+ECG renderer 像素容差比對
+
+用法：
+    python -m app.rendering.golden            # raster 對 matplotlib
+    python -m app.rendering.golden raster     # 指定要驗證的 renderer
+"""
+from PIL import Image
+from io import BytesIO
+import numpy as np
+import sys
+
+from . import get_renderer
+from .geometry import RHYTHM_SAMPLES
+
+# 灰階差異超過此值的像素視為不一致
+MISMATCH_LEVEL = 64
+# 預設容差：平均灰階差與不一致像素比例
+MAX_MEAN_DIFF = 4.0
+MAX_MISMATCH_RATIO = 0.03
+
+
+def synthetic_wavedata(seed=0, samples=RHYTHM_SAMPLES, hz=500):
+    """產生固定的合成 12 導程 ECG (mV)，用於 renderer 比對"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(samples) / hz
+    beat = np.zeros(samples)
+    for start in np.arange(0.3, samples / hz, 0.8):
+        beat += 1.2 * np.exp(-(((t - start) / 0.012) ** 2))
+        beat -= 0.2 * np.exp(-(((t - start - 0.03) / 0.015) ** 2))
+        beat += 0.3 * np.exp(-(((t - start - 0.25) / 0.05) ** 2))
+    wavedata = {}
+    for i, lead in enumerate(["I", "II", "V1", "V2", "V3", "V4", "V5", "V6"]):
+        wavedata[lead] = beat * (0.5 + 0.1 * i) + 0.02 * rng.standard_normal(samples)
+    wavedata["AVR"] = -1 * ((wavedata["I"] + wavedata["II"]) / 2)
+    wavedata["AVL"] = wavedata["I"] - wavedata["II"] / 2
+    wavedata["AVF"] = wavedata["II"] - wavedata["I"] / 2
+    wavedata["III"] = wavedata["II"] - wavedata["I"]
+    return wavedata
+
+
+def _to_gray(image):
+    if isinstance(image, (bytes, bytearray)):
+        image = Image.open(BytesIO(image))
+    return np.asarray(image.convert("L"), dtype=np.int16)
+
+
+def pixel_diff(image_a, image_b):
+    """比較兩張圖 (PIL Image 或 PNG bytes)，回傳差異統計"""
+    a = _to_gray(image_a)
+    b = _to_gray(image_b)
+    if a.shape != b.shape:
+        return {"same_size": False, "shape_a": a.shape, "shape_b": b.shape}
+    diff = np.abs(a - b)
+    return {
+        "same_size": True,
+        "max": int(diff.max()),
+        "mean": float(diff.mean()),
+        "mismatch_ratio": float((diff > MISMATCH_LEVEL).mean()),
+    }
+
+
+def within_tolerance(stats, max_mean=MAX_MEAN_DIFF, max_mismatch=MAX_MISMATCH_RATIO):
+    return (
+        stats["same_size"]
+        and stats["mean"] <= max_mean
+        and stats["mismatch_ratio"] <= max_mismatch
+    )
+
+
+def check_renderer(name="raster", reference="matplotlib", seed=0):
+    """以同一份合成 ECG 比對 renderer 與參考 renderer 的輸出"""
+    wavedata = synthetic_wavedata(seed)
+    candidate = get_renderer(name).render_ecg_png(wavedata)
+    expected = get_renderer(reference).render_ecg_png(wavedata)
+    stats = pixel_diff(expected, candidate)
+    return within_tolerance(stats), stats
+
+
+if __name__ == "__main__":
+    name = sys.argv[1] if len(sys.argv) > 1 else "raster"
+    ok, stats = check_renderer(name)
+    print(f"{'✅' if ok else '❌'} {name} vs matplotlib: {stats}")
+    sys.exit(0 if ok else 1)
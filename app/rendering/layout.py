@@ -0,0 +1,141 @@
+from typing import NamedTuple
+import numpy as np
+import os
+
+from .decimate import decimate
+from .geometry import LEAD_INDEX, RHYTHM_SAMPLES, stack_leads
+
+# 🚀 宣告式導程排版：每種版面只是一張 slot 表，
+#    取樣索引、x 軸、垂直偏移與標籤位置在建立版面時預先算好，所有 renderer 共用同一個繪圖核心
+
+# 預設版面，可用環境變數切換 (3x4+rhythm / 6x2 / rhythm)
+ECG_LAYOUT = os.getenv("ECG_LAYOUT", "3x4+rhythm")
+
+# 顯示標籤 (其餘導程標籤與名稱相同)
+LEAD_LABELS = {"AVR": "aVR", "AVL": "aVL", "AVF": "aVF"}
+
+SAMPLE_SPACING_MM = 0.05  # 25 mm/s @ 500 Hz
+GAIN_MM_PER_MV = 10
+LABEL_OFFSET_MM = 3
+
+
+class LeadSlot(NamedTuple):
+    """版面上的一個導程位置：波形 [start, stop) 畫在 (h_offset, v_offset)"""
+    lead: str
+    start: int
+    stop: int
+    h_offset: float
+    v_offset: float
+
+    @property
+    def label(self):
+        return LEAD_LABELS.get(self.lead, self.lead)
+
+
+class EcgLayout:
+    """導程排版表，建立時一次預先計算所有幾何資料"""
+
+    def __init__(self, name, slots):
+        self.name = name
+        self.slots = tuple(slots)
+        self.samples = max(slot.stop for slot in self.slots)
+        self.labels = [slot.label for slot in self.slots]
+        self.label_positions = np.array(
+            [[slot.h_offset, slot.v_offset - LABEL_OFFSET_MM] for slot in self.slots],
+            dtype=np.float64,
+        )
+
+        # 相同長度的 slot 合成一組，繪圖時一次 fancy indexing 取出整組波形
+        by_length = {}
+        for slot in self.slots:
+            by_length.setdefault(slot.stop - slot.start, []).append(slot)
+        self._groups = []
+        # segments() 的輸出順序 (依長度分組)，向量輸出用來對應導程名稱
+        self.segment_slots = [slot for group in by_length.values() for slot in group]
+        for length, group in by_length.items():
+            rows = np.stack([np.arange(slot.start, slot.stop) for slot in group])
+            cols = np.array([LEAD_INDEX[slot.lead] for slot in group])[:, None]
+            x = np.stack(
+                [np.arange(length) * SAMPLE_SPACING_MM + slot.h_offset for slot in group]
+            )
+            v = np.array([slot.v_offset for slot in group], dtype=np.float64)[:, None]
+            self._groups.append((rows, cols, x, v))
+
+    def segments(self, wavedata, px_per_mm=None, decimation=None):
+        """一次向量化計算所有導程的折線頂點 (mm)，回傳 (n, 2) 陣列的 list
+
+        指定 px_per_mm 時依輸出解析度抽點 (見 decimate.py)
+        """
+        wave = stack_leads(wavedata)
+        if wave.shape[0] < self.samples:
+            # 波形較短時以最後一點補齊，避免索引超出範圍
+            wave = np.pad(wave, ((0, self.samples - wave.shape[0]), (0, 0)), mode="edge")
+        segments = []
+        for rows, cols, x, v in self._groups:
+            y = wave[rows, cols] * GAIN_MM_PER_MV + v
+            segments.extend(np.stack([x, y], -1))
+        if px_per_mm is not None:
+            segments = [
+                decimate(segment, SAMPLE_SPACING_MM, px_per_mm, decimation) for segment in segments
+            ]
+        return segments
+
+
+def _window(k, length=1250, gap=20):
+    """第 k 個時間窗 (從 0 開始)，尾端保留 gap 個取樣點的間隔"""
+    return k * length, (k + 1) * length - gap
+
+
+def _columns(columns, h_offsets, v_offsets, window):
+    slots = []
+    for k, (leads, h_offset) in enumerate(zip(columns, h_offsets)):
+        start, stop = window(k)
+        for lead, v_offset in zip(leads, v_offsets):
+            slots.append(LeadSlot(lead, start, stop, h_offset, v_offset))
+    return slots
+
+
+# 標準 3x4 + 節律條 (原本手寫的版面)
+STANDARD_LAYOUT = EcgLayout(
+    "3x4+rhythm",
+    _columns(
+        [["I", "II", "III"], ["AVR", "AVL", "AVF"], ["V1", "V2", "V3"], ["V4", "V5", "V6"]],
+        h_offsets=[6, 68, 132, 194],
+        v_offsets=[115, 82, 48],
+        window=_window,
+    )
+    + [LeadSlot("II", 0, RHYTHM_SAMPLES, 6, 13)],
+)
+
+# 6x2：肢體導程前 5 秒、胸導程後 5 秒
+LAYOUT_6X2 = EcgLayout(
+    "6x2",
+    _columns(
+        [["I", "II", "III", "AVR", "AVL", "AVF"], ["V1", "V2", "V3", "V4", "V5", "V6"]],
+        h_offsets=[6, 135],
+        v_offsets=[112, 92, 72, 52, 32, 12],
+        window=lambda k: _window(k, length=2500),
+    ),
+)
+
+# 只有 10 秒節律條
+RHYTHM_LAYOUT = EcgLayout(
+    "rhythm",
+    [
+        LeadSlot("II", 0, RHYTHM_SAMPLES, 6, 100),
+        LeadSlot("V1", 0, RHYTHM_SAMPLES, 6, 60),
+        LeadSlot("V5", 0, RHYTHM_SAMPLES, 6, 20),
+    ],
+)
+
+LAYOUTS = {layout.name: layout for layout in (STANDARD_LAYOUT, LAYOUT_6X2, RHYTHM_LAYOUT)}
+
+
+def get_layout(layout=None):
+    """依名稱或物件取得版面，未指定時使用 ECG_LAYOUT"""
+    if isinstance(layout, EcgLayout):
+        return layout
+    name = layout or ECG_LAYOUT
+    if name not in LAYOUTS:
+        raise ValueError(f"未知的 ECG_LAYOUT: {name}")
+    return LAYOUTS[name]
@@ -0,0 +1,142 @@
+import os
+import time
+
+import fitz
+import numpy as np
+
+from .codecs import EncodedImage
+from .geometry import FAT_WIDTH, PAD_INCH, THIN_WIDTH, X_MM, Y_MM, M_Y_INCH, dpi_for_width
+from .layout import get_layout
+from .raster import LABEL_FONT_PT, TRACE_WIDTH_PT
+
+# 🚀 PDF 報告：與 PNG 共用 layout_report 的版面，格線與波形以向量繪製 (PyMuPDF Shape)
+#    不再把整張 PNG 內嵌進 PDF，檔案更小、產生更快，列印時不失真
+#    整頁只用一個 Shape、commit 一次 (每次 commit 都會重新壓縮整個內容串流)
+
+# 1x 報告像素換算為 PDF pt (0.5 → 1200x750 px 的版面為 600x375 pt)
+REPORT_PDF_SCALE = float(os.getenv("REPORT_PDF_SCALE", "0.5"))
+# 依此列印解析度抽點 (見 decimate.py)
+REPORT_PDF_DPI = int(os.getenv("REPORT_PDF_DPI", "300"))
+
+PDF_MEDIA_TYPE = "application/pdf"
+# Arial 的 ascender：PNG 以文字左上角定位，PDF 以基線定位
+_ASCENT = 0.905
+THIN_COLOR = (1, 0.7, 0.7)
+FAT_COLOR = (1, 0.4, 0.4)
+
+
+def _font_name(text):
+    """內建 helv 只有拉丁字元，含中文時改用內建繁中字型"""
+    return "helv" if text.isascii() else "china-t"
+
+
+def _insert_text(shape, xy, text, fontsize, color=(0, 0, 0)):
+    """以文字左上角 (與 PIL 相同) 定位插入文字"""
+    shape.insert_text(
+        (xy[0], xy[1] + fontsize * _ASCENT), text, fontsize=fontsize, fontname=_font_name(text), color=color
+    )
+
+
+class _PaperTransform:
+    """ECG 紙張 mm (y 軸向上) → PDF pt (y 軸向下)，與 raster.to_pixels 相同的幾何"""
+
+    def __init__(self, origin, width_pt):
+        self.dpi = dpi_for_width(width_pt)
+        self.scale = self.dpi / 25.4
+        self.pad = PAD_INCH * self.dpi
+        self.x0 = origin[0] + self.pad
+        self.bottom = origin[1] + (M_Y_INCH + 2 * PAD_INCH) * self.dpi - self.pad
+
+    def points(self, points_mm):
+        pt = np.empty_like(points_mm, dtype=np.float64)
+        pt[..., 0] = self.x0 + (points_mm[..., 0] + 0.5) * self.scale
+        pt[..., 1] = self.bottom - (points_mm[..., 1] + 0.5) * self.scale
+        return pt
+
+    def x(self, mm):
+        return self.x0 + (mm + 0.5) * self.scale
+
+    def y(self, mm):
+        return self.bottom - (mm + 0.5) * self.scale
+
+
+def _path_ops(shape, points):
+    """折線 → PDF 路徑運算子 (m / l)；Shape.draw_polyline 逐點建立 Point 物件，上萬點時太慢"""
+    flat = np.column_stack([points[:, 0], shape.height - points[:, 1]]).ravel().tolist()
+    return "%.1f %.1f m\n" % tuple(flat[:2]) + "%.1f %.1f l\n" * (len(points) - 1) % tuple(flat[2:])
+
+
+def _stroke(shape, paths, color, width, line_join=0):
+    """多條折線合成一個 path，只設定一次顏色與線寬"""
+    shape.draw_cont = "".join(_path_ops(shape, points) for points in paths)
+    shape.finish(color=color, width=width, lineJoin=line_join, closePath=False)
+
+
+def _draw_grid(shape, paper):
+    """細線每 1 mm、粗線每 5 mm (與點陣格線相同位置)"""
+    left, right = paper.x0, paper.x0 + X_MM * paper.scale
+    top, bottom = paper.bottom - Y_MM * paper.scale, paper.bottom
+    width_scale = paper.dpi / 72
+    for fat, color, width in ((False, THIN_COLOR, THIN_WIDTH), (True, FAT_COLOR, FAT_WIDTH)):
+        paths = [
+            np.array([[paper.x(i), top], [paper.x(i), bottom]])
+            for i in range(X_MM) if (i % 5 == 0 or i == X_MM - 1) == fat
+        ] + [
+            np.array([[left, paper.y(i)], [right, paper.y(i)]])
+            for i in range(Y_MM) if (i % 5 == 0 or i == Y_MM - 1) == fat
+        ]
+        _stroke(shape, paths, color, max(width * width_scale, 0.1))
+
+
+def draw_ecg_pdf(shape, wavedata, origin, width_pt, layout=None):
+    """以 PDF Shape 繪製格線、導程標籤與波形折線 (由呼叫端 commit)"""
+    layout = get_layout(layout)
+    paper = _PaperTransform(origin, width_pt)
+    _draw_grid(shape, paper)
+
+    label_size = LABEL_FONT_PT * paper.dpi / 72
+    for label, xy in zip(layout.labels, paper.points(layout.label_positions)):
+        _insert_text(shape, xy, label, label_size)
+
+    px_per_mm = paper.scale * REPORT_PDF_DPI / 72
+    _stroke(
+        shape,
+        [paper.points(segment) for segment in layout.segments(wavedata, px_per_mm=px_per_mm)],
+        (0, 0, 0),
+        TRACE_WIDTH_PT * paper.dpi / 72,
+        line_join=1,
+    )
+
+
+def render_page_pdf(report_page, wavedata, scale=REPORT_PDF_SCALE):
+    """依報告版面 (report.ReportPage) 輸出單頁 PDF，回傳 EncodedImage"""
+    from .report import ECG_PLACEHOLDER_TEXT
+
+    started_at = time.perf_counter()
+    doc = fitz.open()
+    page = doc.new_page(width=report_page.width * scale, height=report_page.height * scale)
+    shape = page.new_shape()
+    fontsize = report_page.font_size * scale
+    message_xy = (report_page.message_xy[0] * scale, report_page.message_xy[1] * scale)
+
+    if report_page.ecg_origin is not None:
+        try:
+            draw_ecg_pdf(
+                shape,
+                wavedata,
+                (report_page.ecg_origin[0] * scale, report_page.ecg_origin[1] * scale),
+                report_page.ecg_width * scale,
+            )
+        except Exception as e:
+            print(f"⚠️  ECG 向量繪製失敗: {e}")
+            _insert_text(shape, message_xy, f"ECG 圖像載入失敗: {str(e)}", fontsize, color=(1, 0, 0))
+    else:
+        _insert_text(shape, message_xy, ECG_PLACEHOLDER_TEXT, fontsize, color=(0.5, 0.5, 0.5))
+
+    for x, y, line in report_page.lines:
+        _insert_text(shape, (x * scale, y * scale), line, fontsize)
+    shape.commit()
+
+    data = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+    return EncodedImage(data, PDF_MEDIA_TYPE, "pdf-vector", time.perf_counter() - started_at)
@@ -0,0 +1,135 @@
+from PIL import Image, ImageDraw, ImageFont
+from functools import lru_cache
+import numpy as np
+import base64
+from io import BytesIO
+
+from .geometry import (
+    X_MM, Y_MM, M_X_INCH, M_Y_INCH, DPI, PAD_INCH,
+)
+from .layout import get_layout
+
+# 🚀 不依賴 matplotlib 的 ECG 點陣繪圖：numpy 做座標轉換，Pillow ImageDraw.line 畫折線
+#    輸出與 matplotlib 版本相同的 268x129 mm 幾何 (含 tight bbox 的 0.1 inch 白邊)
+
+# 格線每像素的紅色覆蓋率 (對齊 Agg 繪製 0.04pt / 0.2pt 細線的結果)
+THIN_ALPHA = 0.045
+FAT_ALPHA = 0.22
+TRACE_WIDTH_PT = 0.5
+LABEL_FONT_PT = 18
+
+
+def _px_per_mm(dpi):
+    return dpi / 25.4
+
+
+def _pad_px(dpi):
+    return PAD_INCH * dpi
+
+
+def canvas_size(dpi=DPI):
+    """與 savefig(bbox_inches="tight") 相同的輸出尺寸 (px)"""
+    return (
+        int((M_X_INCH + 2 * PAD_INCH) * dpi + 1e-6),
+        int((M_Y_INCH + 2 * PAD_INCH) * dpi + 1e-6),
+    )
+
+
+def _grid_alpha(n, length_px, pad, scale, flip=False):
+    """計算單一方向每個像素的格線覆蓋率 (flip=True 表示 y 軸由下往上)"""
+    alpha = np.zeros(length_px)
+    lines = np.arange(n)
+    weights = np.where(lines % 5 == 0, FAT_ALPHA, THIN_ALPHA)
+    weights[-1] = FAT_ALPHA
+    pos = pad + (lines + 0.5) * scale
+    if flip:
+        pos = length_px - pos
+    pos = np.floor(pos - 0.5).astype(int)
+    for shift in (0, 1):
+        idx = np.clip(pos + shift, 0, length_px - 1)
+        np.maximum.at(alpha, idx, weights)
+    return alpha
+
+
+@lru_cache(maxsize=4)
+def _grid_image(dpi):
+    """預先繪製並快取 ECG 紙張格線"""
+    width, height = canvas_size(dpi)
+    scale = _px_per_mm(dpi)
+    pad = _pad_px(dpi)
+    ax = _grid_alpha(X_MM, width, pad, scale)
+    ay = _grid_alpha(Y_MM, height, pad, scale, flip=True)
+    # 格線只畫在紙張範圍內，白邊維持純白
+    x0, x1 = int(pad), int(pad + X_MM * scale)
+    y0, y1 = int(height - pad - Y_MM * scale), int(height - pad)
+    ax[:x0] = ax[x1:] = 0
+    ay[:y0] = ay[y1:] = 0
+    alpha = 1 - (1 - ay[:, None]) * (1 - ax[None, :])
+    alpha[:y0, :] = alpha[y1:, :] = 0
+    alpha[:, :x0] = alpha[:, x1:] = 0
+    gb = np.round(255 * (1 - alpha)).astype(np.uint8)
+    rgb = np.stack([np.full_like(gb, 255), gb, gb], -1)
+    return Image.fromarray(rgb, "RGB")
+
+
+@lru_cache(maxsize=4)
+def _label_font(size_px):
+    try:
+        return ImageFont.truetype("fonts/arial.ttf", size_px)
+    except Exception:
+        try:
+            return ImageFont.truetype("DejaVuSans.ttf", size_px)
+        except Exception:
+            return ImageFont.load_default()
+
+
+def to_pixels(points_mm, dpi=DPI, origin=(0, 0)):
+    """將 mm 座標 (y 軸向上) 轉為像素座標 (y 軸向下)"""
+    scale = _px_per_mm(dpi)
+    pad = _pad_px(dpi)
+    height = canvas_size(dpi)[1]
+    px = np.empty_like(points_mm, dtype=np.float64)
+    px[..., 0] = origin[0] + pad + (points_mm[..., 0] + 0.5) * scale
+    px[..., 1] = origin[1] + height - pad - (points_mm[..., 1] + 0.5) * scale
+    return px
+
+
+@lru_cache(maxsize=8)
+def _background(dpi, layout):
+    """格線 + 導程標籤是固定內容，每種 dpi / 版面只繪製一次，之後直接貼上"""
+    img = _grid_image(dpi).copy()
+    draw = ImageDraw.Draw(img)
+    font = _label_font(int(round(LABEL_FONT_PT * dpi / 72)))
+    for label, (x, y) in zip(layout.labels, to_pixels(layout.label_positions, dpi)):
+        draw.text((x, y), label, fill="black", font=font, anchor="la")
+    return img
+
+
+def draw_ecg(canvas, wavedata, origin=(0, 0), dpi=DPI, layout=None):
+    """將格線與波形直接繪製到既有的 PIL 畫布上"""
+    layout = get_layout(layout)
+    canvas.paste(_background(dpi, layout), origin)
+    draw = ImageDraw.Draw(canvas)
+
+    width = max(1, int(round(TRACE_WIDTH_PT * dpi / 72)))
+    for segment in layout.segments(wavedata, px_per_mm=_px_per_mm(dpi)):
+        draw.line(to_pixels(segment, dpi, origin).ravel().tolist(), fill="black", width=width)
+
+
+def render_ecg_image(wavedata, dpi=DPI, layout=None):
+    """繪製 ECG 並回傳 PIL Image (RGB)"""
+    img = Image.new("RGB", canvas_size(dpi), "white")
+    draw_ecg(img, wavedata, dpi=dpi, layout=layout)
+    return img
+
+
+def render_ecg_png(wavedata, dpi=DPI, layout=None):
+    """繪製 ECG 並回傳 PNG bytes"""
+    png_bytes = BytesIO()
+    render_ecg_image(wavedata, dpi, layout).save(png_bytes, format="PNG")
+    return png_bytes.getvalue()
+
+
+def render_ecg_base64(wavedata, dpi=DPI, layout=None):
+    """繪製 ECG 並回傳 base64 字串，可直接顯示於網頁"""
+    return base64.b64encode(render_ecg_png(wavedata, dpi, layout)).decode()
@@ -0,0 +1,180 @@
+from PIL import Image, ImageDraw, ImageFont
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+import os
+
+from . import get_renderer
+from .codecs import encode_image
+from .geometry import dpi_for_width
+
+# 🚀 報告畫布直接以最終尺寸繪製 ECG，不再經過 PNG → base64 → 解碼 → 縮放 的往返
+#    整張報告只編碼一次；字型每個 process 只載入一次，固定文字預先點陣化後直接貼上
+#    版面 (layout_report) 只計算一次，PNG (Pillow) 與 PDF (pdf.py，向量波形) 共用
+
+# 畫布尺寸：ECG 區域 + 文字區域
+REPORT_WIDTH = 1200
+ECG_HEIGHT = 600
+TEXT_AREA_HEIGHT = 150
+ECG_ORIGIN = (0, 20)
+TEXT_ORIGIN = (20, ECG_HEIGHT + 40)
+LINE_SPACING = 30
+FONT_SIZE = 24
+
+ECG_PLACEHOLDER_TEXT = "註: ECG 圖像暫時無法顯示"
+
+# 額外版本 (與主圖同一次繪圖工作產生)：thumbnail (列表預覽) / print (列印解析度)
+# 預設不產生：inline 存放時每個版本都是 DiagnosticReport 內的一份 base64 附件，需要時再以環境變數開啟
+REPORT_RENDITIONS = tuple(
+    name.strip() for name in os.getenv("REPORT_RENDITIONS", "").split(",") if name.strip()
+)
+# 縮圖由主圖整數倍縮小 (box filter)，1200 / 4 = 300px 寬
+THUMBNAIL_REDUCE = int(os.getenv("REPORT_THUMBNAIL_REDUCE", "4"))
+# 列印版本以整數倍解析度重新繪製 (2 = 2400x1500)
+PRINT_SCALE = int(os.getenv("REPORT_PRINT_SCALE", "2"))
+RENDITIONS = ("full", "thumbnail", "print")
+
+
+@lru_cache(maxsize=None)
+def _load_font(size):
+    """載入專案字型，失敗時依序退回 simsun / 預設字型"""
+    try:
+        return ImageFont.truetype("fonts/arial.ttf", size)
+    except Exception:
+        try:
+            return ImageFont.truetype("fonts/simsun.ttc", size)
+        except Exception:
+            print("⚠️  無法載入專案字型，使用預設字型")
+            return ImageFont.load_default()
+
+
+@lru_cache(maxsize=32)
+def _text_block(text, size=FONT_SIZE):
+    """將固定文字預先點陣化為遮罩 (L)，之後以 paste 取代逐字繪製"""
+    font = _load_font(size)
+    _, _, right, bottom = ImageDraw.Draw(Image.new("L", (1, 1))).multiline_textbbox((0, 0), text, font=font)
+    mask = Image.new("L", (max(1, right), max(1, bottom)))
+    ImageDraw.Draw(mask).multiline_text((0, 0), text, fill=255, font=font)
+    return mask
+
+
+def paste_text(canvas, xy, text, fill="black", size=FONT_SIZE):
+    """貼上快取的固定文字區塊 (與 draw.text 的輸出相同)"""
+    mask = _text_block(text, size)
+    canvas.paste(fill, (xy[0], xy[1], xy[0] + mask.width, xy[1] + mask.height), mask)
+
+
+class ReportPage(NamedTuple):
+    """報告版面 (單位：1x 報告像素)，各輸出格式依自己的比例換算"""
+    width: int
+    height: int
+    ecg_origin: Optional[Tuple[int, int]]  # 沒有波形時為 None
+    ecg_width: int
+    message_xy: Tuple[int, int]  # 佔位 / 錯誤訊息位置
+    lines: Tuple[Tuple[int, int, str], ...]  # 判讀文字 (x, y 為文字左上角, 內容)
+    font_size: int
+
+
+def layout_report(wavedata, report_text):
+    """計算報告版面：ECG 區域在上，判讀文字在下"""
+    height = ECG_HEIGHT + TEXT_AREA_HEIGHT
+    lines = []
+    y = TEXT_ORIGIN[1]
+    for line in report_text.replace("<br>", "\n").split("\n"):
+        if y < height - 20:  # 防止超出邊界
+            lines.append((TEXT_ORIGIN[0], y, line))
+            y += LINE_SPACING
+    return ReportPage(
+        width=REPORT_WIDTH,
+        height=height,
+        ecg_origin=ECG_ORIGIN if wavedata is not None else None,
+        ecg_width=REPORT_WIDTH,
+        message_xy=(20, 100),
+        lines=tuple(lines),
+        font_size=FONT_SIZE,
+    )
+
+
+def compose_report(wavedata, report_text, scale=1, renderer=None, page=None):
+    """組合 ECG 與判讀文字，回傳最終尺寸的 PIL Image (scale 為整數倍解析度)"""
+    page = page or layout_report(wavedata, report_text)
+    canvas = Image.new("RGB", (page.width * scale, page.height * scale), "white")
+    draw = ImageDraw.Draw(canvas)
+    font = _load_font(page.font_size * scale)
+    message_xy = (page.message_xy[0] * scale, page.message_xy[1] * scale)
+
+    # 1. ECG 直接以最終寬度繪製到畫布上
+    if page.ecg_origin is not None:
+        try:
+            get_renderer(renderer).draw_ecg(
+                canvas,
+                wavedata,
+                (page.ecg_origin[0] * scale, page.ecg_origin[1] * scale),
+                dpi_for_width(page.ecg_width * scale),
+            )
+        except Exception as e:
+            print(f"⚠️  ECG 圖像繪製失敗: {e}")
+            draw.text(message_xy, f"ECG 圖像載入失敗: {str(e)}", fill="red", font=font)
+    else:
+        paste_text(canvas, message_xy, ECG_PLACEHOLDER_TEXT, fill="gray", size=page.font_size * scale)
+
+    # 2. 判讀文字在 ECG 下方 (只有這裡是每位病人不同的內容)
+    for x, y, line in page.lines:
+        draw.text((x * scale, y * scale), line, fill="black", font=font)
+    return canvas
+
+
+def compose_renditions(wavedata, report_text, renditions=()):
+    """主圖 (full) 加上指定的額外版本，回傳 {名稱: PIL Image}"""
+    images = {"full": compose_report(wavedata, report_text)}
+    for name in renditions:
+        if name == "thumbnail":
+            images[name] = images["full"].reduce(THUMBNAIL_REDUCE)
+        elif name == "print":
+            images[name] = compose_report(wavedata, report_text, scale=PRINT_SCALE)
+        elif name != "full":
+            raise ValueError(f"未知的 REPORT_RENDITIONS: {name}")
+    return images
+
+
+def encode_png(image):
+    """將報告編碼為 PNG bytes"""
+    return encode_image(image, "png-optimized").data
+
+
+def render_report_png(wavedata, report_text):
+    """繪製完整報告並只編碼一次 PNG"""
+    return encode_png(compose_report(wavedata, report_text))
+
+
+def render_report(wavedata, report_text, profile=None, renderer=None):
+    """繪製完整報告並依編碼設定檔輸出，回傳 EncodedImage"""
+    return encode_image(compose_report(wavedata, report_text, renderer=renderer), profile)
+
+
+def render_renditions(wavedata, report_text, profile=None, renditions=()):
+    """同一次繪圖產生主圖與額外版本，回傳 {名稱: EncodedImage}"""
+    return {
+        name: encode_image(image, profile)
+        for name, image in compose_renditions(wavedata, report_text, renditions).items()
+    }
+
+
+def render_report_pdf(wavedata, report_text):
+    """以同一個版面輸出 PDF (波形為向量折線)，回傳 EncodedImage"""
+    from .pdf import render_page_pdf
+    return render_page_pdf(layout_report(wavedata, report_text), wavedata)
+
+
+def render_report_formats(wavedata, report_text, formats=("png",), profile=None):
+    """版面只計算一次，輸出 png 及 / 或 pdf，回傳 {格式: EncodedImage}"""
+    page = layout_report(wavedata, report_text)
+    outputs = {}
+    for fmt in formats:
+        if fmt == "png":
+            outputs[fmt] = encode_image(compose_report(wavedata, report_text, page=page), profile)
+        elif fmt == "pdf":
+            from .pdf import render_page_pdf
+            outputs[fmt] = render_page_pdf(page, wavedata)
+        else:
+            raise ValueError(f"未知的報告格式: {fmt}")
+    return outputs
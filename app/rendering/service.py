@@ -0,0 +1,310 @@
+import asyncio
+import collections
+import multiprocessing
+import os
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+
+from .geometry import stack_leads
+from .shm import ArenaFull, WaveformArena, WaveformHandle, attach
+
+# 🚀 繪圖服務：把報告繪製與 PNG 編碼移到有上限的 process pool，不佔用事件迴圈
+#    - 佇列深度上限：超過時直接拒絕，避免請求無限堆積
+#    - 單一工作逾時
+#    - 每個 worker 處理 N 個工作後整批回收，控制 matplotlib 的記憶體洩漏
+#    - 記錄排隊等待時間與實際繪圖時間
+#    - 波形經由共享記憶體 arena 傳給 worker，不必 pickle 整個陣列
+
+RENDER_MODE = os.getenv("RENDER_MODE", "process")  # process / thread
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+RENDER_MAX_QUEUE = int(os.getenv("RENDER_MAX_QUEUE", "16"))
+RENDER_TIMEOUT = float(os.getenv("RENDER_TIMEOUT", "30"))
+RENDER_MAX_JOBS_PER_WORKER = int(os.getenv("RENDER_MAX_JOBS_PER_WORKER", "200"))
+# process 模式下以共享記憶體傳遞波形 (0 = 關閉，改回 pickle)
+RENDER_SHM = os.getenv("RENDER_SHM", "1") == "1"
+# 佇列已滿時回應 503 的 Retry-After 秒數
+RENDER_RETRY_AFTER = int(os.getenv("RENDER_RETRY_AFTER", "5"))
+
+
+class RenderUnavailable(Exception):
+    """暫時無法繪圖 (滿載 / 逾時)，呼叫端應退回佔位圖或請用戶端稍後重試，而不是判定報告失敗"""
+
+
+class RenderQueueFull(RenderUnavailable):
+    pass
+
+
+class RenderTimeout(RenderUnavailable):
+    pass
+
+
+def _warm_up():
+    """worker 啟動時先載入 renderer，第一個工作不必付匯入成本"""
+    from . import get_renderer
+    get_renderer()
+
+
+def _render_report_job(wave, report_text, submitted_at, profile=None, renditions=()):
+    """在 worker 內執行：回傳 ({版本: EncodedImage}, 排隊秒數, 繪圖秒數)"""
+    from .codecs import encode_image
+    from .report import compose_renditions
+
+    if isinstance(wave, WaveformHandle):
+        wave = attach(wave)
+    started_at = time.time()
+    images = compose_renditions(wave, report_text, renditions)
+    render_time = time.time() - started_at
+    encoded = {name: encode_image(image, profile) for name, image in images.items()}
+    return encoded, started_at - submitted_at, render_time
+
+
+def _worker_processes(executor):
+    """ProcessPoolExecutor 的 worker process 清單
+
+    標準函式庫沒有公開的 API 可取得 worker，只能讀私有的 _processes (shutdown 後會被設為 None，
+    需在 shutdown 前取得)；屬性不存在或型別不同時回傳空清單，只是無法強制終止，不影響繪圖
+    """
+    processes = getattr(executor, "_processes", None)
+    if not isinstance(processes, dict):
+        print("⚠️  無法取得繪圖 pool 的 worker process，逾時時將無法強制終止")
+        return []
+    return list(processes.values())
+
+
+def _terminate(processes):
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+class RenderMetrics:
+    """繪圖服務統計，保留最近 window 筆的耗時"""
+
+    def __init__(self, window=500):
+        self.counters = collections.Counter()
+        self.queue_wait = collections.deque(maxlen=window)
+        self.render_time = collections.deque(maxlen=window)
+        # 依編碼設定檔分別統計編碼耗時與輸出大小
+        self.encode_time = collections.defaultdict(lambda: collections.deque(maxlen=window))
+        self.encoded_bytes = collections.defaultdict(lambda: collections.deque(maxlen=window))
+
+    def observe(self, queue_wait, render_time, encoded=None):
+        self.queue_wait.append(queue_wait)
+        self.render_time.append(render_time)
+        if encoded is not None:
+            self.encode_time[encoded.profile].append(encoded.encode_time)
+            self.encoded_bytes[encoded.profile].append(len(encoded.data))
+
+    @staticmethod
+    def _summary(samples):
+        if not samples:
+            return {"count": 0}
+        ordered = sorted(samples)
+        return {
+            "count": len(ordered),
+            "avg_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+            "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2),
+        }
+
+    def snapshot(self):
+        return {
+            "counters": dict(self.counters),
+            "queue_wait": self._summary(self.queue_wait),
+            "render_time": self._summary(self.render_time),
+            "encode": {
+                profile: dict(
+                    self._summary(samples),
+                    avg_bytes=round(sum(self.encoded_bytes[profile]) / len(self.encoded_bytes[profile])),
+                )
+                for profile, samples in self.encode_time.items()
+                if samples
+            },
+        }
+
+
+class RenderService:
+    """有上限的 process pool 繪圖服務"""
+
+    def __init__(
+        self,
+        workers=RENDER_WORKERS,
+        max_queue=RENDER_MAX_QUEUE,
+        timeout=RENDER_TIMEOUT,
+        max_jobs_per_worker=RENDER_MAX_JOBS_PER_WORKER,
+        mode=RENDER_MODE,
+        use_shm=RENDER_SHM,
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.mode = mode
+        self.use_shm = use_shm and mode == "process"
+        self.metrics = RenderMetrics()
+        self._arena = None
+        self._executor = None
+        # 已退役但 worker 可能仍在處理工作的 pool → 其 worker process (shutdown 前取得)
+        self._retired = {}
+        self._jobs_on_executor = 0
+        self._pending = 0
+
+    def _new_executor(self):
+        # spawn：不繼承事件迴圈與執行緒狀態，worker 乾淨地只載入繪圖模組
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up,
+        )
+
+    def _retire_executor(self, terminate=False):
+        """讓目前的 pool 處理完手上的工作後結束，新工作改用新的 pool
+
+        退役的 pool 記在 _retired，之後其中的工作逾時仍可終止它的 worker
+        terminate=True (逾時) 時直接終止 worker：shutdown(wait=False) 只是不再接新工作，
+        卡住的 worker 會一直存活，反覆逾時會累積孤兒 process
+        """
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            self._retired[executor] = _worker_processes(executor)
+            executor.shutdown(wait=False, cancel_futures=terminate)
+            self.metrics.counters["recycled"] += 1
+            if terminate:
+                self._terminate_retired(executor)
+
+    def _terminate_retired(self, executor):
+        """終止已退役 pool 的 worker (逾時的工作卡在其中)"""
+        processes = self._retired.pop(executor, None)
+        if processes is not None:
+            _terminate(processes)
+            self.metrics.counters["terminated"] += 1
+
+    def _prune_retired(self):
+        """移除 worker 都已結束的退役 pool"""
+        for executor, processes in list(self._retired.items()):
+            if not any(process.is_alive() for process in processes):
+                del self._retired[executor]
+
+    def _get_executor(self):
+        self._prune_retired()
+        if self._jobs_on_executor >= self.workers * self.max_jobs_per_worker:
+            self._retire_executor()
+        if self._executor is None:
+            self._executor = self._new_executor()
+            self._jobs_on_executor = 0
+        self._jobs_on_executor += 1
+        return self._executor
+
+    def _get_arena(self):
+        # 每個排隊中的工作最多佔一個 slot
+        if self._arena is None:
+            self._arena = WaveformArena(self.max_queue)
+        return self._arena
+
+    def _pack_wave(self, wavedata):
+        """process 模式下把波形寫入共享記憶體，回傳 (傳給 worker 的參數, 釋放函式)"""
+        wave = stack_leads(wavedata)
+        if not self.use_shm:
+            return wave, None
+        arena = self._get_arena()
+        try:
+            handle = arena.write(wave)
+        except (ArenaFull, ValueError):
+            # slot 不足或波形過長時退回 pickle
+            self.metrics.counters["shm_fallback"] += 1
+            return wave, None
+        return handle, lambda _: arena.release(handle)
+
+    def has_capacity(self):
+        """佇列是否還能接受新工作 (建立 ServiceRequest 前先檢查，滿載時直接回 503)"""
+        return self._pending < self.max_queue
+
+    async def render_report(self, wavedata, report_text, profile=None):
+        """繪製完整報告並依編碼設定檔輸出，回傳 EncodedImage"""
+        return (await self.render_renditions(wavedata, report_text, profile))["full"]
+
+    async def render_renditions(self, wavedata, report_text, profile=None, renditions=()):
+        """同一個工作繪製主圖與額外版本 (thumbnail / print)，回傳 {版本: EncodedImage}"""
+        renditions = tuple(renditions)
+        if self._pending >= self.max_queue:
+            self.metrics.counters["rejected"] += 1
+            raise RenderQueueFull(f"繪圖佇列已滿 ({self._pending}/{self.max_queue})")
+
+        self._pending += 1
+        self.metrics.counters["submitted"] += 1
+        try:
+            if self.mode == "thread":
+                executor = None
+                job = asyncio.get_running_loop().run_in_executor(
+                    None, _render_report_job, stack_leads(wavedata), report_text, time.time(), profile, renditions
+                )
+            else:
+                executor = self._get_executor()
+                wave, release = self._pack_wave(wavedata)
+                future = executor.submit(
+                    _render_report_job, wave, report_text, time.time(), profile, renditions
+                )
+                if release is not None:
+                    # 等 worker 真正結束才釋放 slot；逾時後仍在讀取的 worker 不會讀到被覆寫的資料
+                    future.add_done_callback(release)
+                job = asyncio.wrap_future(future)
+            try:
+                encoded, queue_wait, render_time = await asyncio.wait_for(job, self.timeout)
+            except asyncio.TimeoutError:
+                self.metrics.counters["timeouts"] += 1
+                # 卡住的 worker 無法單獨終止，整個 pool 退役並終止其 worker，後續工作改用新的 pool
+                # 工作所在的 pool 可能已因定期回收而退役，同樣要終止，否則卡住的 worker 永遠不會結束
+                if executor is not None:
+                    if executor is self._executor:
+                        self._retire_executor(terminate=True)
+                    else:
+                        self._terminate_retired(executor)
+                raise RenderTimeout(f"報告繪製逾時 ({self.timeout}s)")
+            except BrokenExecutor as e:
+                # worker 異常結束 (或同一個 pool 的其他工作逾時而被終止)，壞掉的 pool 一併退役
+                self.metrics.counters["failed"] += 1
+                if executor is self._executor:
+                    self._retire_executor()
+                raise RenderUnavailable(f"繪圖 worker 已終止: {e}")
+            except Exception:
+                self.metrics.counters["failed"] += 1
+                raise
+            self.metrics.counters["completed"] += 1
+            self.metrics.observe(queue_wait, render_time, encoded["full"])
+            for name in renditions:
+                self.metrics.counters[f"rendition_{name}"] += 1
+            return encoded
+        finally:
+            self._pending -= 1
+
+    def snapshot(self):
+        data = self.metrics.snapshot()
+        data.update(
+            {
+                "mode": self.mode,
+                "workers": self.workers,
+                "pending": self._pending,
+                "max_queue": self.max_queue,
+                "jobs_on_executor": self._jobs_on_executor,
+                "retired_pools": len(self._retired),
+                "shm": self.use_shm,
+                "shm_free_slots": self._arena.available() if self._arena else None,
+            }
+        )
+        return data
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        # 退役 pool 中仍在執行 (或卡住) 的 worker 一併終止
+        for executor in list(self._retired):
+            self._terminate_retired(executor)
+        if self._arena is not None:
+            self._arena.close()
+            self._arena = None
+
+
+# 每個 uvicorn worker 一個服務實例
+render_service = RenderService()
@@ -0,0 +1,108 @@
+from multiprocessing import shared_memory
+from typing import NamedTuple
+import collections
+import contextlib
+import threading
+import numpy as np
+
+from .geometry import RHYTHM_SAMPLES, LEAD_ORDER, stack_leads
+
+# 🚀 共享記憶體波形區：擷取階段只寫入一次，worker process 直接附掛讀取，不經過 pickle 複製
+#    slot 以參考計數回收；同一個 arena 也可給批次回填 (backfill) 重複使用
+
+
+class WaveformHandle(NamedTuple):
+    """可 pickle 的小型描述子，worker 用它找到共享記憶體中的波形"""
+    shm_name: str
+    slot: int
+    offset: int
+    rows: int
+    cols: int
+    dtype: str
+
+
+class ArenaFull(Exception):
+    pass
+
+
+class WaveformArena:
+    """固定大小 slot 的共享記憶體區"""
+
+    def __init__(self, slots, samples=RHYTHM_SAMPLES, leads=len(LEAD_ORDER), dtype=np.float64):
+        self.slots = slots
+        self.samples = samples
+        self.leads = leads
+        self.dtype = np.dtype(dtype)
+        self.slot_bytes = samples * leads * self.dtype.itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=slots * self.slot_bytes)
+        self._refcounts = [0] * slots
+        self._free = collections.deque(range(slots))
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def available(self):
+        with self._lock:
+            return len(self._free)
+
+    def write(self, wavedata):
+        """將波形寫入空的 slot (參考計數 = 1)，回傳 handle"""
+        wave = stack_leads(wavedata)
+        rows, cols = wave.shape
+        if rows > self.samples or cols != self.leads:
+            raise ValueError(f"波形尺寸 {wave.shape} 超出 slot 大小 {(self.samples, self.leads)}")
+        with self._lock:
+            if not self._free:
+                raise ArenaFull(f"共享記憶體 slot 已用完 ({self.slots})")
+            slot = self._free.popleft()
+            self._refcounts[slot] = 1
+        offset = slot * self.slot_bytes
+        view = np.ndarray((rows, cols), dtype=self.dtype, buffer=self._shm.buf, offset=offset)
+        view[...] = wave
+        return WaveformHandle(self._shm.name, slot, offset, rows, cols, self.dtype.str)
+
+    def retain(self, handle):
+        with self._lock:
+            self._refcounts[handle.slot] += 1
+
+    def release(self, handle):
+        """參考計數歸零時 slot 回到可用清單"""
+        with self._lock:
+            self._refcounts[handle.slot] -= 1
+            if self._refcounts[handle.slot] == 0:
+                self._free.append(handle.slot)
+
+    @contextlib.contextmanager
+    def lease(self, wavedata):
+        """批次處理用：with arena.lease(w) as handle: ...，離開時自動 release"""
+        handle = self.write(wavedata)
+        try:
+            yield handle
+        finally:
+            self.release(handle)
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+
+# worker 端已附掛的共享記憶體 (每個 process 每個 arena 只附掛一次)
+_ATTACHED = {}
+
+
+def attach(handle):
+    """在 worker 中以零複製方式取得唯讀的 (N, 12) 波形陣列"""
+    shm = _ATTACHED.get(handle.shm_name)
+    if shm is None:
+        shm = shared_memory.SharedMemory(name=handle.shm_name)
+        _ATTACHED[handle.shm_name] = shm
+    wave = np.ndarray(
+        (handle.rows, handle.cols),
+        dtype=np.dtype(handle.dtype),
+        buffer=shm.buf,
+        offset=handle.offset,
+    )
+    wave.flags.writeable = False
+    return wave
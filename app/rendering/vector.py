@@ -0,0 +1,135 @@
+import json
+import os
+import numpy as np
+
+from .codecs import accept_quality, parse_accept
+from .geometry import X_MM, Y_MM
+from .layout import GAIN_MM_PER_MV, SAMPLE_SPACING_MM, get_layout
+
+# 🚀 向量輸出：ECG 只輸出波形折線，紙張格線交給前端繪製
+#    - svg：每個導程一個 <path>，y 以整數量化單位的相對座標表示
+#    - polyline：每個導程只存起點與 y 的差分 (x 固定間距，不必存)
+#    實測 (合成 12 導程 + 雜訊，1200px 抽點，0.1 mm 量化)：svg ~47 KB / polyline ~46 KB，
+#    約為 png-optimized 報告 (~106 KB) 的 1/2；gzip 後 ~11 KB 才有約 10 倍差距
+#    大小主要由抽點後的點數決定，量化單位 0.05 → 0.1 mm 只少約 6%
+
+# 預設輸出格式：png (完整報告點陣圖) / svg / polyline
+REPORT_FORMAT = os.getenv("REPORT_FORMAT", "png")
+
+# 波形 y 座標量化單位 (mm)，0.1 mm 約為 1200px 寬報告上 0.45 像素 (仍低於 1 像素)
+VECTOR_PRECISION_MM = float(os.getenv("VECTOR_PRECISION_MM", "0.1"))
+# 前端預期的顯示寬度 (px)，依此抽點 (ECG_DECIMATION)；0 表示輸出全部取樣點
+VECTOR_WIDTH_PX = int(os.getenv("VECTOR_WIDTH_PX", "1200"))
+
+OUTPUT_FORMATS = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "polyline": "application/vnd.ecg.polyline+json",
+}
+_FORMAT_BY_MEDIA_TYPE = {media_type: fmt for fmt, media_type in OUTPUT_FORMATS.items()}
+
+LABEL_FONT_MM = 18 / 72 * 25.4
+
+
+def select_format(fmt=None, accept=None):
+    """依查詢參數 > Accept 標頭 > REPORT_FORMAT 的順序決定輸出格式
+
+    Accept 與 codecs.select_profile 相同依 q 值選擇 (q=0 表示不接受)，q 相同或都不接受時維持 REPORT_FORMAT
+    """
+    if fmt:
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"未知的輸出格式: {fmt}")
+        return fmt
+    if not accept:
+        return REPORT_FORMAT
+    ranges = parse_accept(accept)
+    best, best_q = REPORT_FORMAT, accept_quality(ranges, OUTPUT_FORMATS.get(REPORT_FORMAT, "")) or 0.0
+    for name, media_type in OUTPUT_FORMATS.items():
+        q = accept_quality(ranges, media_type)
+        if q is not None and q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def _quantized_leads(wavedata, layout, precision, width_px=VECTOR_WIDTH_PX):
+    """回傳 [(slot, 起點 x (mm), 取樣索引差分, 量化後的 y 整數陣列)]"""
+    layout = get_layout(layout)
+    px_per_mm = width_px / X_MM if width_px else None
+    leads = []
+    for slot, segment in zip(layout.segment_slots, layout.segments(wavedata, px_per_mm)):
+        x0 = float(segment[0, 0])
+        dx = np.diff(np.rint((segment[:, 0] - x0) / SAMPLE_SPACING_MM).astype(np.int64))
+        y = np.rint(segment[:, 1] / precision).astype(np.int64)
+        leads.append((slot, x0, dx, y))
+    return layout, leads
+
+
+def _fmt(value):
+    """精簡的數字字串：去掉多餘的 0 與小數點"""
+    text = f"{value:.3f}".rstrip("0").rstrip(".")
+    return text if text not in ("", "-0") else "0"
+
+
+def render_ecg_svg(wavedata, layout=None, precision=VECTOR_PRECISION_MM, width_px=VECTOR_WIDTH_PX):
+    """輸出 SVG 字串 (viewBox 以 mm 為單位，不含格線)"""
+    layout, leads = _quantized_leads(wavedata, layout, precision, width_px)
+    # 資料座標 y 軸向上，範圍 -0.5 ~ Y_MM - 0.5，與點陣 renderer 一致
+    top = Y_MM - 1
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="-0.5 -0.5 {X_MM} {Y_MM}" '
+        f'width="{X_MM}mm" height="{Y_MM}mm" data-layout="{layout.name}">',
+        '<g fill="none" stroke="#000" stroke-width="1" stroke-linejoin="round" '
+        'vector-effect="non-scaling-stroke">',
+    ]
+    for slot, x0, dx, y in leads:
+        # x 以取樣點 (SAMPLE_SPACING_MM) 為單位，y 以量化單位表示，差分後多為 1~2 位數
+        deltas = " ".join(f"{a} {b}" for a, b in zip(dx.tolist(), (-np.diff(y)).tolist()))
+        parts.append(
+            f'<path data-lead="{slot.lead}" vector-effect="non-scaling-stroke" '
+            f'transform="matrix({_fmt(SAMPLE_SPACING_MM)} 0 0 {_fmt(precision)} '
+            f'{_fmt(x0)} {_fmt(top)})" d="M0 {-int(y[0])}l{deltas}"/>'
+        )
+    parts.append("</g>")
+    parts.append(f'<g font-family="Arial,sans-serif" font-size="{_fmt(LABEL_FONT_MM)}">')
+    for label, (x, y) in zip(layout.labels, layout.label_positions):
+        parts.append(f'<text x="{_fmt(x)}" y="{_fmt(top - y)}" dominant-baseline="hanging">{label}</text>')
+    parts.append("</g></svg>")
+    return "".join(parts)
+
+
+def render_ecg_polyline(wavedata, layout=None, precision=VECTOR_PRECISION_MM, width_px=VECTOR_WIDTH_PX):
+    """輸出差分編碼的折線資料 (dict)
+
+    每個導程：x = x0 + cumsum(dx) * sample_spacing_mm (沒有 dx 時每點間隔 1 個取樣)；
+    y = (y0 + cumsum(dy)) * precision_mm
+    """
+    layout, leads = _quantized_leads(wavedata, layout, precision, width_px)
+    return {
+        "layout": layout.name,
+        "paper_mm": [X_MM, Y_MM],
+        "sample_spacing_mm": SAMPLE_SPACING_MM,
+        "gain_mm_per_mv": GAIN_MM_PER_MV,
+        "precision_mm": precision,
+        "labels": [
+            {"text": label, "x": float(x), "y": float(y)}
+            for label, (x, y) in zip(layout.labels, layout.label_positions)
+        ],
+        "leads": [_polyline_lead(slot, x0, dx, y) for slot, x0, dx, y in leads],
+    }
+
+
+def _polyline_lead(slot, x0, dx, y):
+    lead = {"lead": slot.lead, "x0": x0, "y0": int(y[0])}
+    if not (dx == 1).all():
+        lead["dx"] = dx.tolist()
+    lead["dy"] = np.diff(y).tolist()
+    return lead
+
+
+def encode_vector(wavedata, fmt, layout=None):
+    """輸出指定向量格式的 bytes"""
+    if fmt == "svg":
+        return render_ecg_svg(wavedata, layout).encode("utf-8")
+    if fmt == "polyline":
+        return json.dumps(render_ecg_polyline(wavedata, layout), separators=(",", ":")).encode("utf-8")
+    raise ValueError(f"不是向量格式: {fmt}")
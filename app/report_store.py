@@ -0,0 +1,195 @@
+import base64
+import collections
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+from typing import NamedTuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from .fhir_builder import attachment_json, create_resource
+
+# 🚀 報告圖像存放方式：
+#    inline - 預設，base64 直接放在 presentedForm.data (舊行為)
+#    binary - 另存為 FHIR Binary 資源，presentedForm 只放 url
+#    blob   - 存到本機 content-addressed 目錄 (檔名為 sha256)，由 /STEMI/blob/{name} 提供
+#    非 inline 模式下 DiagnosticReport 只剩幾 KB，圖像可以另外快取與串流
+
+REPORT_IMAGE_STORAGE = os.getenv("REPORT_IMAGE_STORAGE", "inline")
+REPORT_BLOB_DIR = os.getenv("REPORT_BLOB_DIR", "data/report_blobs")
+# blob 的對外網址前綴 (含 root_path)
+REPORT_BLOB_BASE_URL = os.getenv("REPORT_BLOB_BASE_URL", "/api/STEMI/blob")
+
+STORAGE_MODES = ("inline", "binary", "blob")
+
+# 圖像端點的記憶體快取上限 (MB)；final 報告不會再變動，快取不需要失效
+REPORT_IMAGE_CACHE_MB = float(os.getenv("REPORT_IMAGE_CACHE_MB", "64"))
+# 圖像需要登入才能取得，預設只允許瀏覽器快取；由 nginx 代為快取時可改為 public
+REPORT_IMAGE_CACHE_CONTROL = os.getenv("REPORT_IMAGE_CACHE_CONTROL", "private, max-age=31536000, immutable")
+
+# 向量輸出的 media type 沒有內建副檔名
+_EXTENSIONS = {
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/svg+xml": ".svg",
+    "application/vnd.ecg.polyline+json": ".json",
+}
+_MEDIA_TYPES = {ext: media_type for media_type, ext in _EXTENSIONS.items()}
+BLOB_NAME = re.compile(r"^[0-9a-f]{64}\.[a-z]+$")
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+def fhir_hash(data):
+    """FHIR Attachment.hash：SHA-1 的 base64"""
+    return base64.b64encode(hashlib.sha1(data).digest()).decode()
+
+
+def blob_name(data, content_type):
+    extension = _EXTENSIONS.get(content_type) or mimetypes.guess_extension(content_type) or ".bin"
+    return hashlib.sha256(data).hexdigest() + extension
+
+
+def blob_path(name):
+    if not BLOB_NAME.match(name):
+        raise BlobNotFound(name)
+    # 以前兩碼分目錄，避免單一目錄檔案過多
+    return os.path.join(REPORT_BLOB_DIR, name[:2], name)
+
+
+def blob_media_type(name):
+    extension = os.path.splitext(name)[1]
+    return _MEDIA_TYPES.get(extension) or mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+def write_blob(data, content_type):
+    """寫入 content-addressed blob (相同內容只存一份)，回傳檔名"""
+    name = blob_name(data, content_type)
+    path = blob_path(name)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先寫暫存檔再 rename，讀取端不會看到寫到一半的檔案
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return name
+
+
+def read_blob(name):
+    try:
+        with open(blob_path(name), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        raise BlobNotFound(name)
+
+
+async def store_attachment(client, data, content_type, title=None, mode=None):
+    """依存放模式建立 presentedForm 附件 dict (client 為 AsyncFHIRClient)"""
+    mode = mode or REPORT_IMAGE_STORAGE
+    if mode == "inline":
+        att = attachment_json(content_type, base64.b64encode(data).decode("utf-8"), title)
+    elif mode == "binary":
+        resp = await create_resource(
+            client,
+            {
+                "resourceType": "Binary",
+                "contentType": content_type,
+                "data": base64.b64encode(data).decode("utf-8"),
+            },
+        )
+        att = {"contentType": content_type, "url": client.url(f"Binary/{resp['id']}")}
+        if title:
+            att["title"] = title
+    elif mode == "blob":
+        name = await run_in_threadpool(write_blob, data, content_type)
+        att = {"contentType": content_type, "url": f"{REPORT_BLOB_BASE_URL}/{name}"}
+        if title:
+            att["title"] = title
+    else:
+        raise ValueError(f"未知的 REPORT_IMAGE_STORAGE: {mode}")
+    att["size"] = len(data)
+    att["hash"] = fhir_hash(data)
+    return att
+
+
+async def load_attachment(client, att):
+    """取回附件的原始 bytes (inline / Binary / blob 皆可)"""
+    if att.get("data"):
+        return base64.b64decode(att["data"])
+    url = att.get("url")
+    if not url:
+        raise BlobNotFound("附件沒有 data 也沒有 url")
+    if url.startswith(REPORT_BLOB_BASE_URL + "/"):
+        return await run_in_threadpool(read_blob, url[len(REPORT_BLOB_BASE_URL) + 1:])
+    # FHIR Binary：以 FHIR JSON 取回，data 為 base64
+    binary = await client.read_url(url)
+    return base64.b64decode(binary["data"])
+
+
+class CachedImage(NamedTuple):
+    data: bytes
+    media_type: str
+    etag: str
+
+
+class ImageCache:
+    """以總 bytes 為上限的 LRU 快取 (加鎖，在執行緒池中使用也安全)"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def put(self, key, item):
+        if len(item.data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old.data)
+            self._items[key] = item
+            self.size += len(item.data)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted.data)
+
+    def snapshot(self):
+        return {
+            "items": len(self._items),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+image_cache = ImageCache(int(REPORT_IMAGE_CACHE_MB * 1024 * 1024))
+
+
+def content_etag(data):
+    """強 ETag：內容的 SHA-1 (與 Attachment.hash 相同)，各圖像端點共用同一種驗證值"""
+    return f'"{fhir_hash(data)}"'
+
+
+def attachment_etag(att, data):
+    """優先使用附件已存的 hash，舊報告沒有 hash 時自行計算"""
+    return f'"{att["hash"]}"' if att.get("hash") else content_etag(data)
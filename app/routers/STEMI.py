@@ -1,46 +1,112 @@
-from fastapi import APIRouter, Request, Path, Depends, Response, HTTPException, status
-import json
+from fastapi import APIRouter, Request, Path, Query, Depends, Response, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 import fhirclient.models.servicerequest as SR
-import fhirclient.models.diagnosticreport as DR
-import fhirclient.models.observation as OBS
-import fhirclient.models.activitydefinition as AD
-import fhirclient.models.fhirreference as fref
-import fhirclient.models.attachment as ATT
 import fhirclient.models.fhirdate as fd
-import fhirclient.models.coding as Coding
 
 from io import BytesIO
 import base64
-from PIL import Image, ImageDraw, ImageFont
+import orjson
 from datetime import datetime, timedelta
+from typing import Optional
 import pytz
-from app.fhir_processor import fhir_server
+from app.fhir_processor import fhir_client
+from app.fhir_builder import (
+    FHIR_SUBMIT_MODE, build_stemi_observation, create_resource, new_full_url, stemi_projection, submit_transaction,
+    fail_report, finalize_report, stemi_report_json,
+)
 from app.JWT import get_user, create_access_token
-from app.inference import stemiInf, STEMI_ICD_DICT
+from app.inference import stemiInf
 from app.models import get_session, Resources
+from app.rendering import (
+    OUTPUT_FORMATS, REPORT_RENDITIONS, RENDITIONS, encode_vector, render_renditions, select_format, select_profile,
+)
+from app.rendering.service import RENDER_RETRY_AFTER, RenderUnavailable, render_service
+from app.report_store import (
+    REPORT_IMAGE_CACHE_CONTROL, BlobNotFound, CachedImage, attachment_etag, blob_media_type, content_etag, image_cache,
+    load_attachment, read_blob, store_attachment,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
-# 🚀 性能優化：應用啟動時快取 JSON 模板，避免每次檔案 I/O
-_CACHED_DR_TEMPLATE = None
-_CACHED_OBS_TEMPLATE = None
 _TIMEZONE_TAIPEI = pytz.timezone("Asia/Taipei")
 
-def _load_json_templates():
-    """載入並快取 JSON 模板"""
-    global _CACHED_DR_TEMPLATE, _CACHED_OBS_TEMPLATE
-    
-    if _CACHED_DR_TEMPLATE is None:
-        with open("app/emptyDR/stemi.dr.json", "r", encoding="utf-8") as f:
-            _CACHED_DR_TEMPLATE = json.load(f)
-    
-    if _CACHED_OBS_TEMPLATE is None:
-        with open("app/emptyOBS/stemi.obs.json", "r", encoding="utf-8") as f:
-            _CACHED_OBS_TEMPLATE = json.load(f)
-    
-    return _CACHED_DR_TEMPLATE.copy(), _CACHED_OBS_TEMPLATE.copy()
 
-# 初始化快取
-_load_json_templates()
+def _fhir_response(content, response=None):
+    """FHIR 資源直接以 orjson 輸出，略過 jsonable_encoder 走訪整個資源 (含 base64 附件)"""
+    return ORJSONResponse(content, headers=dict(response.headers) if response is not None else None)
+
+
+def _select_forms(dr, rendition):
+    """挑出指定版本的 presentedForm (舊報告沒有 title，視為 full)"""
+    return [att for att in dr.get("presentedForm") or [] if (att.get("title") or "full") == rendition]
+
+
+def _parse_range(header, size):
+    """解析單一 bytes range，回傳 (start, end) 含 end；不支援或格式錯誤時回傳 None (回整個檔案)"""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            # bytes=-N：最後 N bytes
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+def _image_response(request, image):
+    """輸出圖像 bytes：強 ETag、immutable 快取、If-None-Match 回 304、單一 Range 回 206"""
+    headers = {
+        "ETag": image.etag,
+        "Cache-Control": REPORT_IMAGE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if "*" in tags or image.etag in tags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == image.etag):
+        byte_range = _parse_range(range_header, len(image.data))
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(image.data)}"
+            return Response(
+                image.data[start:end + 1],
+                status_code=status.HTTP_206_PARTIAL_CONTENT,
+                media_type=image.media_type,
+                headers=headers,
+            )
+    return Response(image.data, media_type=image.media_type, headers=headers)
+
+
+def _sr_record(sr, srid, user, requester, create_time):
+    """ServiceRequest 的 Resources 記錄"""
+    return Resources(
+        res_id=srid,
+        res_type=sr.resource_type,
+        user=user,
+        requester=requester,
+        model="STEMI",
+        status=sr.status,
+        create_time=create_time,
+        self_id=srid
+    )
 
 
 router = APIRouter(
@@ -57,48 +123,63 @@ async def test_endpoint():
 async def inference(
     response: Response,
     r: Request,
+    format: Optional[str] = Query(None, description="png / svg / polyline，未指定時依 Accept 標頭"),
+    profile: Optional[str] = Query(None, description="點陣報告編碼設定檔：png-optimized / png-fast / png-palette / webp-lossless"),
     user: str = Depends(get_user),
     db: AsyncSession = Depends(get_session),
 ):
 
-    info = await r.json()
+    # 🚀 ECG 輸出格式：向量格式 (svg / polyline) 的格線由前端繪製，資料量與編碼時間都遠小於 PNG
+    try:
+        output_format = select_format(format, r.headers.get("accept"))
+        image_profile = select_profile(profile, r.headers.get("accept"))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # 🚀 繪圖佇列滿載時在建立 ServiceRequest 之前就回 503，讓用戶端稍後重試
+    if output_format == "png" and not render_service.has_capacity():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="報告繪圖佇列已滿，請稍後重試",
+            headers={"Retry-After": str(RENDER_RETRY_AFTER)},
+        )
+
+    # 🚀 SR 內含 base64 XML，請求本體可達數 MB，以 orjson 解析
+    info = orjson.loads(await r.body())
     sr = SR.ServiceRequest(info)
     if sr.occurrenceDateTime is None:
         occurrence = fd.FHIRDate()
         occurrence.date = datetime.now(pytz.timezone("Asia/Taipei"))
         sr.occurrenceDateTime = occurrence
 
-    resp = sr.create(fhir_server)
-    srid = resp["id"]
-
     # 🚀 直接處理 contained 資料，簡化流程
     contained = {item.id: item for item in sr.contained}
-
-    # 🚀 直接建立 PostgreSQL 記錄，不使用批次操作
+    requester = contained[sr.requester.reference[1:]].name
     current_time_naive = datetime.now().replace(tzinfo=None)  # 無時區的時間
-    sr_res = Resources(
-        res_id=srid,
-        res_type=sr.resource_type,
-        user=user,
-        requester=contained[sr.requester.reference[1:]].name,
-        model="STEMI",
-        status=sr.status,
-        create_time=current_time_naive,
-        self_id=srid
-    )
-    db.add(sr_res)
-    await db.commit()
 
-    # 🚀 直接載入 JSON 模板，簡化處理
-    drjs = json.load(open("app/emptyDR/stemi.dr.json", "r", encoding="utf-8"))
-    dr = DR.DiagnosticReport(drjs)
+    # 🚀 transaction 模式：SR 延後到推論完成後與 DR 同一個 Bundle 送出，DR 以 urn:uuid 參照 SR
+    transaction = FHIR_SUBMIT_MODE == "transaction"
+    if transaction:
+        srid = None
+        sr_reference = new_full_url()
+    else:
+        # 🚀 FHIR 請求走共用連線池的非同步 client，不阻塞事件迴圈
+        resp = await fhir_client.create(sr.as_json())
+        srid = resp["id"]
+        sr_reference = f"ServiceRequest/{srid}"
+
+        # 🚀 直接建立 PostgreSQL 記錄，不使用批次操作
+        db.add(_sr_record(sr, srid, user, requester, current_time_naive))
+        await db.commit()
+
+    # 🚀 DiagnosticReport / Observation 以 dict 組合，orjson 序列化 (見 app/fhir_builder.py)
+    dr = stemi_report_json()
 
     try:
-        ref1 = fref.FHIRReference()
-        ref1.identifier = sr.identifier[0]
-        ref2 = fref.FHIRReference()
-        ref2.reference = f"ServiceRequest/{srid}"
-        dr.basedOn = [ref1, ref2]
+        dr["basedOn"] = [
+            {"identifier": sr.identifier[0].as_json()},
+            {"reference": sr_reference},
+        ]
 
         xmlFilelike = BytesIO(
             base64.b64decode(contained[sr.supportingInfo[0].reference[1:]].data)
@@ -108,7 +189,10 @@ async def inference(
         if stemiInf is None:
             raise ImportError("STEMI AI 推論模組載入失敗，請檢查 inference 模組")
 
-        report, opt, img, raw_out = stemiInf(xmlFilelike)
+        # 🚀 推論移到執行緒池，避免阻塞事件迴圈
+        # 只取 DR 需要的判讀文字、原始輸出與波形；opt_report / 獨立 ECG 圖不會被計算
+        result = await run_in_threadpool(stemiInf, xmlFilelike)
+        report, raw_out, wavedata = result.report, result.raw_out, result.wavedata
         
         # 🚀 安全檢查：確保 AI 推論結果不是 None
         if raw_out is None:
@@ -149,246 +233,177 @@ async def inference(
         
         # print(f"🔍 STEMI 最終計算: sigmoid={stemi_sigmoid:.6f}, 顯示={stemi_label}: {stemi_display_prob:.2f}%")
 
-        # 檢查是否有有效的圖像資料
-        if img and img.strip():
-            try:
-                # img 已經是 Base64 編碼的字符串，直接解碼為 bytes
-                imgByte = base64.b64decode(img)
-                has_image = True
-            except Exception as e:
-                print(f"⚠️  圖像解碼失敗: {e}")
-                has_image = False
+        # 🚀 ECG 直接以最終尺寸繪製到報告畫布，整張報告只編碼一次 PNG
+        if wavedata is None:
+            print("⚠️  沒有波形資料，將跳過圖像插入")
+        images = []
+        if output_format != "png" and wavedata is not None:
+            # 向量輸出只是 numpy 量化與字串組合，直接在這裡完成
+            image_bytes = encode_vector(wavedata, output_format)
+            images.append((image_bytes, OUTPUT_FORMATS[output_format], "full"))
         else:
-            print("⚠️  沒有圖像資料，將跳過圖像插入")
-            has_image = False
-            
-        # 完全模仿原始 PDF 邏輯，只改成 PNG 輸出
-        # 原始邏輯：
-        # 1. 創建 PDF 頁面 (height=400)
-        # 2. 文字在 (10, 330)
-        # 3. 圖像在 rect(0, 20, page.rect.width, 292+20)
-        
-        # 設定畫布大小 - 基於實際 ECG 圖像尺寸
-        # ECG 原始尺寸：1398×694，適度優化尺寸以平衡品質與檔案大小
-        ecg_width = 1200   # 從 1398 略為縮小，仍保持高品質
-        ecg_height = 600   # 對應縮放，保持比例
-        
-        # 畫布尺寸：為 ECG 圖像預留空間 + 文字區域
-        canvas_width = ecg_width
-        canvas_height = ecg_height + 150  # ECG 圖像 + 文字區域高度
-        
-        # 創建基於實際 ECG 尺寸的白色背景
-        combined_img = Image.new('RGB', (canvas_width, canvas_height), 'white')
-        draw = ImageDraw.Draw(combined_img)
-        
-        # 載入字型 - 使用專案內的字型檔案
-        try:
-            # 調整字型大小以匹配新的圖像尺寸
-            font_size_normal = 24  # 適合 1200px 寬度的字型
-            
-            font_normal = ImageFont.truetype("fonts/arial.ttf", font_size_normal)
-        except:
+            # 繪圖與編碼交給 process pool，不阻塞事件迴圈；縮圖 / 列印版本在同一個工作產生
             try:
-                font_normal = ImageFont.truetype("fonts/simsun.ttc", font_size_normal)
-            except:
-                print("⚠️  無法載入專案字型，使用預設字型")
-                font_normal = ImageFont.load_default()
-
-        # 1. 插入 ECG 圖像 - 保持原始比例和品質
-        if has_image:
-            try:
-                # 載入原始 ECG 圖像
-                original_img = Image.open(BytesIO(imgByte))
-                orig_w, orig_h = original_img.size
-                
-                # ECG 圖像區域：從頂部開始，預留少量邊距
-                img_x = 0
-                img_y = 20
-                
-                # 保持 ECG 圖像原始尺寸，不強制縮放
-                if orig_w == ecg_width and orig_h == ecg_height:
-                    # 完美匹配，直接使用
-                    ecg_img = original_img
-                else:
-                    # 🚀 性能優化：使用更快的重採樣演算法
-                    # LANCZOS 品質最好但較慢，BILINEAR 速度快且品質可接受
-                    aspect_ratio = orig_h / orig_w
-                    new_width = ecg_width
-                    new_height = int(new_width * aspect_ratio)
-                    # 根據圖像大小選擇重採樣方法
-                    if orig_w > ecg_width * 2:  # 大圖像降採樣用 LANCZOS
-                        ecg_img = original_img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    else:  # 小圖像或相近大小用更快的 BILINEAR
-                        ecg_img = original_img.resize((new_width, new_height), Image.Resampling.BILINEAR)
-                
-                # 貼上 ECG 圖像
-                combined_img.paste(ecg_img, (img_x, img_y))
-                # print(f"✅ ECG 圖像已插入: {ecg_img.size[0]}×{ecg_img.size[1]}")
-            except Exception as e:
-                print(f"⚠️  ECG 圖像插入失敗: {e}")
-                draw.text((20, 100), f"ECG 圖像載入失敗: {str(e)}", fill='red', font=font_normal)
-        else:
-            draw.text((20, 100), "註: ECG 圖像暫時無法顯示", fill='gray', font=font_normal)
-        
-        # 2. 插入文字 - 在 ECG 圖像下方
-        # 文字區域位於 ECG 圖像下方
-        text_x = 20
-        text_y = ecg_height + 40  # ECG 圖像高度 + 間距
-        
-        # 🔧 使用與舊版相同的完整 report，高品質字型清晰度
-        full_report_text = report.replace("<br>", "\n")
-        
-        # 將完整報告按行分割
-        report_lines = full_report_text.split('\n')
-        
-        # 繪製完整報告文字
-        y_offset = 0
-        line_spacing = 30  # 適合較大字型的行距
-        for line in report_lines:
-            if text_y + y_offset < canvas_height - 20:  # 防止超出邊界
-                # 高品質字型渲染，保持原始格式
-                draw.text((text_x, text_y + y_offset), line, fill='black', font=font_normal)
-                y_offset += line_spacing
-        
-        # 3. 智能保存為優化的 PNG
-        png_buffer = BytesIO()
-        # 平衡品質與檔案大小的最佳設定
-        combined_img.save(png_buffer, format='PNG', 
-                         optimize=True,         # 啟用 PNG 優化（不影響視覺品質）
-                         compress_level=6,      # 中等壓縮（0-9，6是平衡點）
-                         pnginfo=None)          # 不添加額外元數據
-        
-        # 檢查檔案大小並記錄
-        # png_size = len(png_buffer.getvalue())
-        # print(f"📊 PNG 檔案大小: {png_size / 1024 / 1024:.2f} MB")
-        
-        att = ATT.Attachment()
-        att.contentType = "image/png"
-        png_buffer.seek(0)
-        att.data = base64.b64encode(png_buffer.read()).decode("utf-8")
-
-        # 🚀 直接載入 OBS 模板，簡化處理
-        obsjs = json.load(open("app/emptyOBS/stemi.obs.json", "r", encoding="utf-8"))
-        obs = OBS.Observation(obsjs)
-
-        obs.component[0].interpretation[0].coding[0].code = (
-            "A" if stemi_sigmoid >= 0.5 else "N"
-        )
-        obs.component[0].interpretation[0].coding[0].display = (
-            "Abnormal" if stemi_sigmoid >= 0.5 else "Normal"
-        )
-        obs.component[0].valueQuantity.value = float(f"{stemi_display_prob:.2f}")
-
-        disease = [i for i in raw_out.keys() if i != "STEMI"][0]
-        if disease != "NSR":
-            obs.component[1].code.coding = [
-                Coding.Coding(
-                    {
-                        "code": item["icd"],
-                        "display": item["display"],
-                        "system": "http://hl7.org/fhir/sid/icd-10",
-                    }
+                encoded = await render_service.render_renditions(
+                    wavedata, report, image_profile, REPORT_RENDITIONS
                 )
-                for item in STEMI_ICD_DICT[disease]
-            ]
-            obs.component[1].interpretation[0].coding[0].code = (
-                "A" if raw_out[disease] >= 0.5 else "N"
-            )
-            obs.component[1].interpretation[0].coding[0].display = (
-                "Abnormal" if raw_out[disease] >= 0.5 else "Normal"
-            )
-            obs.component[1].valueQuantity.value = raw_out[disease] * 100
-        else:
-            obs.component[1].code.coding[0].code = "LA25095-3"
-            obs.component[1].code.coding[0].display = "Normal Sinus Rhythm (RSR)"
-            obs.component[1].interpretation[0].coding[0].code = "N"
-            obs.component[1].interpretation[0].coding[0].display = "Normal"
-            obs.component[1].valueQuantity.value = float(
-                f"{raw_out[disease] * 100:.2f}"
-            )
+            except RenderUnavailable as e:
+                # 暫時性的滿載 / 逾時不應讓報告變成 entered-in-error，也不能以缺少波形的佔位圖定稿
+                # (final 報告與其圖像不可變，會以 immutable ETag 長期快取)：改在執行緒池繪製同一份波形
+                # renderer 以 Figure / FigureCanvasAgg 繪圖，不經過 pyplot 全域狀態，可在執行緒內執行
+                print(f"⚠️  {e}，報告改在執行緒池繪製")
+                response.headers["X-Report-Render-Fallback"] = type(e).__name__
+                encoded = await run_in_threadpool(
+                    render_renditions, wavedata, report, image_profile, REPORT_RENDITIONS
+                )
+            image_bytes = encoded["full"].data
+            response.headers["X-Report-Image-Profile"] = encoded["full"].profile
+            response.headers["X-Report-Encode-Ms"] = f"{encoded['full'].encode_time * 1000:.1f}"
+            for name in ("full", *REPORT_RENDITIONS):
+                images.append((encoded[name].data, encoded[name].media_type, name))
+        response.headers["X-Report-Image-Bytes"] = str(len(image_bytes))
 
-        # 🎯 使用簡化的文字，而不是原始的冗長 report
-        # 建立簡潔的結果文字
-        disease = [i for i in raw_out.keys() if i != "STEMI"][0]
-        
-        # 🔧 使用完整的 report，與舊版一致
-        obs.note[0].text = report.replace("<br>", "\n")
+        # 🚀 依 REPORT_IMAGE_STORAGE 內嵌 base64，或另存 Binary / blob 只在 presentedForm 放 url + size + hash
+        attachments = [
+            await store_attachment(fhir_client, data, media_type, name)
+            for data, media_type, name in images
+        ]
 
-        dr.contained = [obs]
-        result = fref.FHIRReference()
-        result.reference = "#anObservation"
-        dr.result = [result]
-        dr.presentedForm = [att]
+        # 🔧 使用完整的 report，與舊版一致
+        obs = build_stemi_observation(raw_out, stemi_sigmoid, stemi_display_prob, report)
+        projection = stemi_projection(raw_out, stemi_sigmoid)
 
         # 🚀 設定時間變數
-        current_time_tz = datetime.now(_TIMEZONE_TAIPEI)
-        issued = fd.FHIRDate()
-        issued.date = current_time_tz + timedelta(minutes=1)
-        dr.issued = issued
-        dr.text = None
-        dr.conclusion = None
-        dr.status = "final"
+        finalize_report(dr, obs, attachments, datetime.now(_TIMEZONE_TAIPEI) + timedelta(minutes=1))
     except Exception as e:
-        print("SRID: ", srid)
+        print("SRID: ", srid or sr_reference)
         print(e)
-        current_time_tz = datetime.now(_TIMEZONE_TAIPEI)
-        issued = fd.FHIRDate()
-        issued.date = current_time_tz
-        dr.issued = issued
-        dr.status = "entered-in-error"
-        dr.conclusion = (
+        fail_report(
+            dr,
             "XML file format error"
             if type(e).__name__ == "ExpatError"
-            else f"{type(e).__name__}: {e}"
+            else f"{type(e).__name__}: {e}",
+            datetime.now(_TIMEZONE_TAIPEI),
         )
     
-    # 🚀 直接執行 FHIR 操作，不使用批次處理
-    resp = dr.create(fhir_server)
-    drid = resp["id"]
+    if transaction:
+        # 🚀 SR + DR 一次往返、HAPI 單一資料庫交易；任一筆失敗則兩筆都不建立
+        (srid, drid), (_, resp) = await submit_transaction(
+            fhir_client, [(sr_reference, sr.as_json()), (new_full_url(), dr)]
+        )
+        db.add(_sr_record(sr, srid, user, requester, current_time_naive))
+    else:
+        # 🚀 直接執行 FHIR 操作，不使用批次處理
+        resp = await create_resource(fhir_client, dr)
+        drid = resp["id"]
     
     # 🚀 直接建立 DR PostgreSQL 記錄
     dr_res = Resources(
         res_id=drid,
-        res_type=dr.resource_type,
+        res_type=dr["resourceType"],
         user=user,
-        requester=contained[sr.requester.reference[1:]].name,
+        requester=requester,
         model="STEMI",
-        status=dr.status,
-        result=obs.as_json() if dr.status == "final" else {"detail": dr.conclusion},
+        status=dr["status"],
+        result=obs if dr["status"] == "final" else {"detail": dr["conclusion"]},
         create_time=current_time_naive,
-        self_id=drid
+        self_id=drid,
+        **(projection if dr["status"] == "final" else {}),
     )
     db.add(dr_res)
     await db.commit()
 
-    if dr.conclusion:
+    if dr.get("conclusion"):
         print("DRID: ", drid)
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, 
             detail={
                 "id":drid,
-                "message": dr.conclusion
+                "message": dr["conclusion"]
             }
         )
     else:
         response.headers[
             "Authorization"
         ] = f"Bearer {create_access_token({'username':user})}"
-        return resp
+        return _fhir_response(resp, response)
+
+@router.get("/render/metrics")
+def get_render_metrics(user: str = Depends(get_user)):
+    """繪圖服務狀態：佇列深度、排隊等待與繪圖耗時，以及圖像端點快取"""
+    return {**render_service.snapshot(), "image_cache": image_cache.snapshot()}
+
+
+@router.get("/blob/{name}")
+async def get_blob(request: Request, name: str = Path(...), user: str = Depends(get_user)):
+    """REPORT_IMAGE_STORAGE=blob 時的報告圖像 (檔名為內容的 sha256，內容不會變動)"""
+    try:
+        data = await run_in_threadpool(read_blob, name)
+    except BlobNotFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="找不到圖像")
+    # ETag 與 /{id}/image 相同 (SHA-1，即 Attachment.hash)，不用檔名的 sha256
+    return _image_response(request, CachedImage(data, blob_media_type(name), content_etag(data)))
+
 
 @router.get("/ActivityDefinition")
-def get_Activity_Definition():
-    return AD.ActivityDefinition.read(2165, fhir_server).as_json()
+async def get_Activity_Definition():
+    return _fhir_response(await fhir_client.read("ActivityDefinition", 2165))
+
+
+@router.get("/{id}/image")
+async def get_Report_image(
+    request: Request,
+    id: str = Path(...),
+    rendition: str = Query("full", description="full / thumbnail / print"),
+    user: str = Depends(get_user),
+):
+    """直接輸出報告圖像的原始 bytes，前端不必下載整份 DR 再解 base64"""
+    if rendition not in RENDITIONS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"未知的 rendition: {rendition}")
+    # 🚀 final 報告不會再變動：快取命中時不需要查 HAPI
+    key = (id, rendition)
+    image = image_cache.get(key)
+    if image is None:
+        dr = await fhir_client.read("DiagnosticReport", id)
+        if dr.get("conclusion"):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=dr["conclusion"]
+            )
+        forms = _select_forms(dr, rendition)
+        if not forms:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"報告沒有 {rendition} 版本")
+        att = forms[0]
+        try:
+            data = await load_attachment(fhir_client, att)
+        except BlobNotFound:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="找不到圖像")
+        image = CachedImage(data, att.get("contentType") or "application/octet-stream", attachment_etag(att, data))
+        if dr.get("status") == "final":
+            image_cache.put(key, image)
+    return _image_response(request, image)
 
 
 @router.get("/{id}")
-def get_Report(response: Response, id: str = Path(...), user: str = Depends(get_user)):
+async def get_Report(
+    response: Response,
+    id: str = Path(...),
+    rendition: str = Query("full", description="full / thumbnail / print / all"),
+    user: str = Depends(get_user),
+):
     response.headers["Authorization"] = f"Bearer {create_access_token({'username':user})}"
-    dr = DR.DiagnosticReport.read(id, fhir_server)
-    if dr.conclusion:
+    if rendition != "all" and rendition not in RENDITIONS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"未知的 rendition: {rendition}")
+    dr = await fhir_client.read("DiagnosticReport", id)
+    if dr.get("conclusion"):
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, 
-            detail=dr.conclusion
+            detail=dr["conclusion"]
         )
-    else:
-        return dr.as_json()
+    # 🚀 只回傳指定版本的圖，列表頁取縮圖只需傳輸幾 KB (舊報告沒有 title，視為 full)
+    if rendition != "all" and dr.get("presentedForm"):
+        forms = _select_forms(dr, rendition)
+        if not forms:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"報告沒有 {rendition} 版本")
+        dr["presentedForm"] = forms
+    return _fhir_response(dr, response)
@@ -0,0 +1,77 @@
+# 🚀 STEMI 術語表：ICD-10 對照、心律名稱與 FHIR coding 片段的唯一來源
+#    所有片段在匯入時建立一次，組合 Observation 時只需查表
+#    片段會被多份資源共用 (直接放進輸出的 dict)，請勿原地修改
+
+ICD10_SYSTEM = "http://hl7.org/fhir/sid/icd-10"
+LOINC_SYSTEM = "http://loinc.org"
+INTERPRETATION_SYSTEM = "http://terminology.hl7.org/CodeSystem/v3-ObservationInterpretation"
+
+STEMI_ICD_DICT = {
+    "AFIB": [
+        {"icd": "I48.0", "display": "Paroxysmal atrial fibrillation"},
+        {"icd": "I48.1", "display": "Persistent atrial fibrillation"},
+        {"icd": "I48.2", "display": "Chronic atrial fibrillation"},
+    ],
+    "AFL": [
+        {"icd": "I48.3", "display": "Typical atrial flutter"},
+        {"icd": "I48.4", "display": "Atypical atrial flutter"},
+    ],
+    "APB": [{"icd": "I49.1", "display": "Atrial fibrillation and flutter"}],
+    "BIGEMINY": [{"icd": "R00.8", "display": "Other abnormalities of heart beat"}],
+    "CHB": [{"icd": "I44.2", "display": "Atrioventricular block, complete"}],
+    "EAR": [{"icd": "I49.8", "display": "Other specified cardiac arrhythmias"}],
+    "FRAV": [{"icd": "I44.0", "display": "Atrioventricular block, first degree"}],
+    "PSVT": [
+        {"icd": "I47.1", "display": "Supraventricular tachycardia"},
+        {"icd": "I47.2", "display": "Ventricular tachycardia"},
+        {"icd": "I47.9", "display": "Paroxysmal tachycardia, unspecified"},
+    ],
+    "SAV": [{"icd": "I44.1", "display": "Atrioventricular block, second degree"}],
+    "ST": [{"icd": "R00.0", "display": "Tachycardia, unspecified"}],
+    "VPB": [{"icd": "I49.3", "display": "Ventricular premature depolarization"}],
+    "SECAV1": [{"icd": "I44.1", "display": "Atrioventricular block, second degree"}],
+}
+
+# 心律標籤的顯示名稱 (ekg_opt_report 使用)
+EKG_NAMES = {'AFIB': 'Atrial Fibrillation ', 'AFL': 'Atrial Flutter',
+             'APB': 'Atrial Premature Beat ', 'BIGEMINY': 'Ventricular Bigeminy',
+             'CHB': 'Complete Heart Block ', 'EAR': 'Ectopic Atrial Rhythm',
+             'FRAV': 'First Degree AV Block ', 'NSR': 'Normal Sinus Rhythm',
+             'PSVT': 'Paroxysmal Supraventricular Tachycardia', 'SAV': 'Second Degree AV Block',
+             'ST': 'Sinus Tachycardia', 'VPB': 'Ventricular Premature Beat',
+             'SECAV1': 'Second Degree AV Block Type 1'}
+
+NSR_LABEL = "NSR"
+NSR_CODING = {"code": "LA25095-3", "display": "Normal Sinus Rhythm (RSR)", "system": LOINC_SYSTEM}
+
+# 心律標籤 → Observation.component[1].code.coding
+RHYTHM_CODINGS = {
+    label: [{"code": item["icd"], "display": item["display"], "system": ICD10_SYSTEM} for item in items]
+    for label, items in STEMI_ICD_DICT.items()
+}
+RHYTHM_CODINGS[NSR_LABEL] = [NSR_CODING]
+
+# 是否異常 → Observation.component[].interpretation
+INTERPRETATIONS = {
+    abnormal: [
+        {
+            "coding": [
+                {
+                    "code": "A" if abnormal else "N",
+                    "display": "Abnormal" if abnormal else "Normal",
+                    "system": INTERPRETATION_SYSTEM,
+                }
+            ]
+        }
+    ]
+    for abnormal in (True, False)
+}
+
+
+def rhythm_coding(label):
+    """心律標籤的 coding 片段 (未知標籤丟出 KeyError，與原本查 STEMI_ICD_DICT 相同)"""
+    return RHYTHM_CODINGS[label]
+
+
+def interpretation(abnormal):
+    return INTERPRETATIONS[bool(abnormal)]
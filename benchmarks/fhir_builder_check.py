@@ -0,0 +1,140 @@
+"""
+FHIR 資源建構等價檢查：dict + orjson (fhir_builder 預設) 與原本的 fhirclient 物件流程
+
+對每個代表性的推論結果 (NSR / 異常心律 / 正常 / STEMI) 各自以兩種方式建立
+Observation 與 DiagnosticReport (final 與 entered-in-error)，先以送出時相同的 orjson 序列化為實際的 bytes，
+再解析後比對 canonical_bytes (排序鍵後的 JSON bytes)。
+
+保證的是「canonical JSON 等價」：內容、數值與型別一致，但鍵的順序不同 (dict 依模板順序、fhirclient
+依 elementProperties 順序)，送出的原始 bytes 並不逐位元組相同；對 FHIR server 而言兩者等價。
+production 預設 FHIR_BUILDER=dict 不必為了這個保證付出兩次建構的成本，改在此 (及 CI) 檢查。
+
+用法 (在專案根目錄執行)：
+    python -m benchmarks.fhir_builder_check
+不一致時印出差異並以非 0 結束，可放進 CI。
+"""
+from datetime import datetime, timedelta
+import base64
+import sys
+
+import fhirclient.models.attachment as ATT
+import fhirclient.models.fhirdate as fd
+import fhirclient.models.fhirreference as fref
+import fhirclient.models.identifier as IDN
+import orjson
+import pytz
+
+from app.fhir_builder import (
+    attachment_json, canonical_bytes, fail_report, finalize_report, stemi_observation_json,
+    stemi_observation_model, stemi_report_json,
+)
+from app.fhir_templates import STEMI_DR_TEMPLATE
+from app.report_store import fhir_hash
+
+# (案例名稱, raw_out, STEMI sigmoid, STEMI 顯示機率, 判讀文字)
+CASES = (
+    ("nsr", {"NSR": 0.9731, "STEMI": 0.12}, 0.12, 88.0, "Normal Sinus Rhythm: 97.31%<br><br>Not Acute STEMI: 88.00%"),
+    ("abnormal-rhythm", {"AFIB": 0.91, "STEMI": 0.3}, 0.3, 70.0, "Atrial Fibrillation: 91.00%<br><br>Not Acute STEMI: 70.00%"),
+    ("normal", {"ST": 0.31, "STEMI": 0.05}, 0.05, 95.0, "Sinus Tachycardia: 31.00%<br><br>Not Acute STEMI: 95.00%"),
+    ("stemi", {"NSR": 0.62, "STEMI": 0.87}, 0.87, 87.0, "Normal Sinus Rhythm: 62.00%<br><br>Acute STEMI: 87.00%"),
+)
+
+SR_IDENTIFIER = {"system": "http://cmuh.org.tw/ecg", "value": "ECG0001"}
+SR_REFERENCE = "ServiceRequest/1"
+ISSUED = pytz.timezone("Asia/Taipei").localize(datetime(2024, 1, 1, 8, 0, 0))
+# 固定內容的附件 (full + thumbnail)，與 inline 存放模式相同帶 size / hash
+IMAGES = ((b"\x89PNG full" * 64, "image/png", "full"), (b"\x89PNG thumb" * 8, "image/png", "thumbnail"))
+
+
+def _fhir_date(value):
+    date = fd.FHIRDate()
+    date.date = value
+    return date
+
+
+def report_dict(case, failed=False):
+    """fhir_builder 的 dict 流程 (與 POST /STEMI/ 相同的呼叫順序)"""
+    _, raw_out, sigmoid, display_prob, report = case
+    dr = stemi_report_json()
+    dr["basedOn"] = [{"identifier": dict(SR_IDENTIFIER)}, {"reference": SR_REFERENCE}]
+    if failed:
+        return None, fail_report(dr, "XML file format error", ISSUED)
+    obs = stemi_observation_json(raw_out, sigmoid, display_prob, report)
+    attachments = []
+    for data, media_type, title in IMAGES:
+        att = attachment_json(media_type, base64.b64encode(data).decode("utf-8"), title)
+        att["size"] = len(data)
+        att["hash"] = fhir_hash(data)
+        attachments.append(att)
+    finalize_report(dr, obs, attachments, ISSUED + timedelta(minutes=1))
+    return obs, dr
+
+
+def report_model(case, failed=False):
+    """原本的 fhirclient 物件流程，回傳 as_json()"""
+    _, raw_out, sigmoid, display_prob, report = case
+    dr = STEMI_DR_TEMPLATE()
+    ref1 = fref.FHIRReference()
+    ref1.identifier = IDN.Identifier(dict(SR_IDENTIFIER))
+    ref2 = fref.FHIRReference()
+    ref2.reference = SR_REFERENCE
+    dr.basedOn = [ref1, ref2]
+    if failed:
+        dr.issued = _fhir_date(ISSUED)
+        dr.status = "entered-in-error"
+        dr.conclusion = "XML file format error"
+        return None, dr.as_json()
+
+    obs = stemi_observation_model(raw_out, sigmoid, display_prob, report)
+    attachments = []
+    for data, media_type, title in IMAGES:
+        att = ATT.Attachment()
+        att.title = title
+        att.contentType = media_type
+        att.data = base64.b64encode(data).decode("utf-8")
+        att.size = len(data)
+        att.hash = fhir_hash(data)
+        attachments.append(att)
+
+    dr.contained = [obs]
+    result = fref.FHIRReference()
+    result.reference = "#anObservation"
+    dr.result = [result]
+    dr.presentedForm = attachments
+    dr.issued = _fhir_date(ISSUED + timedelta(minutes=1))
+    dr.text = None
+    dr.conclusion = None
+    dr.status = "final"
+    return obs.as_json(), dr.as_json()
+
+
+def _wire_canonical(resource):
+    """送出時的 bytes (AsyncFHIRClient 以 orjson.dumps 序列化) → 解析後的 canonical bytes"""
+    return canonical_bytes(orjson.loads(orjson.dumps(resource)))
+
+
+def _compare(label, fast, slow):
+    if _wire_canonical(fast) == _wire_canonical(slow):
+        print(f"✅ {label}")
+        return True
+    print(f"❌ {label} 不一致")
+    print("   dict      :", orjson.dumps(fast, option=orjson.OPT_SORT_KEYS).decode()[:2000])
+    print("   fhirclient:", orjson.dumps(slow, option=orjson.OPT_SORT_KEYS).decode()[:2000])
+    return False
+
+
+def main():
+    ok = True
+    for case in CASES:
+        obs, dr = report_dict(case)
+        obs_model, dr_model = report_model(case)
+        ok &= _compare(f"{case[0]} Observation", obs, obs_model)
+        ok &= _compare(f"{case[0]} DiagnosticReport", dr, dr_model)
+    _, dr = report_dict(CASES[0], failed=True)
+    _, dr_model = report_model(CASES[0], failed=True)
+    ok &= _compare("entered-in-error DiagnosticReport", dr, dr_model)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
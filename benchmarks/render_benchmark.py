@@ -0,0 +1,152 @@
+"""
+ECG 繪圖基準測試與 golden image 回歸檢查
+
+每個 renderer / 輸出目標記錄：執行時間 (多次取中位數)、峰值記憶體 (tracemalloc)、輸出大小，
+並與 benchmarks/golden/ 中的 golden image 做像素容差比對。
+
+輸入：
+    - 固定 seed 的合成 12 導程 ECG
+    - benchmarks/fixtures/*.xml (去識別化的 MUSE XML，有放才會測)
+
+用法 (在專案根目錄執行，字型路徑才會一致)：
+    python -m benchmarks.render_benchmark                    # 量測並比對 golden
+    python -m benchmarks.render_benchmark --update-golden    # 確認輸出正確後更新 golden
+    python -m benchmarks.render_benchmark --repeat 10 --json result.json
+"""
+from io import BytesIO
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from app.rendering import encode_vector, get_renderer, render_report, render_report_pdf
+from app.rendering.golden import pixel_diff, synthetic_wavedata, within_tolerance
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_DIR = os.path.join(BENCH_DIR, "golden")
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+
+SYNTHETIC_SEEDS = (0, 1)
+RENDERERS = ("matplotlib", "raster")
+REPORT_TEXT = "Normal Sinus Rhythm: 92.31%<br><br>Not Acute STEMI: 88.12%"
+
+# 同一個 renderer 與自己的 golden 比對，容差比跨 renderer (golden.py) 嚴格
+REGRESSION_MAX_MEAN = 0.5
+REGRESSION_MAX_MISMATCH = 0.002
+
+
+def load_cases():
+    """回傳 [(案例名稱, wavedata)]"""
+    cases = [(f"synthetic{seed}", synthetic_wavedata(seed)) for seed in SYNTHETIC_SEEDS]
+    if os.path.isdir(FIXTURE_DIR):
+        xml_files = sorted(f for f in os.listdir(FIXTURE_DIR) if f.endswith(".xml"))
+        if xml_files:
+            from app.AI.ECG import parse_muse_wavedata
+
+            for filename in xml_files:
+                with open(os.path.join(FIXTURE_DIR, filename), "rb") as f:
+                    cases.append((os.path.splitext(filename)[0], parse_muse_wavedata(BytesIO(f.read()))))
+    return cases
+
+
+def targets():
+    """回傳 [(目標名稱, 繪圖函式, 是否比對 golden)]"""
+    items = []
+    for name in RENDERERS:
+        renderer = get_renderer(name)
+        items.append((f"ecg-{name}", renderer.render_ecg_png, True))
+        items.append(
+            (
+                f"report-{name}",
+                lambda wavedata, name=name: render_report(wavedata, REPORT_TEXT, "png-optimized", name).data,
+                True,
+            )
+        )
+    items.append(("svg", lambda wavedata: encode_vector(wavedata, "svg"), False))
+    items.append(("polyline", lambda wavedata: encode_vector(wavedata, "polyline"), False))
+    items.append(("report-pdf", lambda wavedata: render_report_pdf(wavedata, REPORT_TEXT).data, False))
+    return items
+
+
+def measure(func, wavedata, repeat):
+    """回傳 (輸出 bytes, 中位數秒數, 峰值記憶體 bytes)"""
+    func(wavedata)  # 暖機：載入模組與快取
+    times = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        output = func(wavedata)
+        times.append(time.perf_counter() - started_at)
+
+    tracemalloc.start()
+    func(wavedata)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return output, statistics.median(times), peak
+
+
+def golden_path(case, target):
+    return os.path.join(GOLDEN_DIR, f"{case}__{target}.png")
+
+
+def run(repeat=5, update_golden=False):
+    results = []
+    for case, wavedata in load_cases():
+        for target, func, compare in targets():
+            output, seconds, peak = measure(func, wavedata, repeat)
+            row = {
+                "case": case,
+                "target": target,
+                "ms": round(seconds * 1000, 2),
+                "peak_kb": round(peak / 1024, 1),
+                "bytes": len(output),
+                "golden": None,
+            }
+            if compare:
+                path = golden_path(case, target)
+                if update_golden:
+                    os.makedirs(GOLDEN_DIR, exist_ok=True)
+                    with open(path, "wb") as f:
+                        f.write(output)
+                    row["golden"] = "updated"
+                elif os.path.exists(path):
+                    with open(path, "rb") as f:
+                        stats = pixel_diff(f.read(), output)
+                    ok = within_tolerance(stats, REGRESSION_MAX_MEAN, REGRESSION_MAX_MISMATCH)
+                    row["golden"] = "pass" if ok else "FAIL"
+                    row["diff"] = stats
+                else:
+                    row["golden"] = "missing"
+            results.append(row)
+    return results
+
+
+def print_table(results):
+    print(f"{'case':<14}{'target':<20}{'ms':>10}{'peak KB':>12}{'bytes':>10}  golden")
+    for row in results:
+        print(
+            f"{row['case']:<14}{row['target']:<20}{row['ms']:>10.2f}{row['peak_kb']:>12.1f}"
+            f"{row['bytes']:>10}  {row['golden'] or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ECG 繪圖基準測試與 golden image 回歸檢查")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--update-golden", action="store_true")
+    parser.add_argument("--json", help="將結果另存為 JSON")
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.update_golden)
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    failed = [row for row in results if row["golden"] in ("FAIL", "missing")]
+    if failed:
+        print(f"❌ {len(failed)} 個輸出與 golden image 不符或缺少 golden")
+        sys.exit(1)
+    print("✅ 所有輸出都在 golden image 容差內")
@@ -0,0 +1,111 @@
+"""
+API 序列化基準測試：stdlib json / FastAPI 預設編碼 與 orjson 的比較
+
+量測項目 (以代表性的 STEMI 資料量)：
+    - POST /STEMI/ 請求解析：ServiceRequest 內含 base64 MUSE XML (約 2 MB)
+    - GET /STEMI/{id} 回應：DiagnosticReport 含 PNG 報告與縮圖附件
+    - Resources.result JSON 欄位序列化 (Observation)
+
+用法：
+    python -m benchmarks.serialization_benchmark
+    python -m benchmarks.serialization_benchmark --repeat 50
+"""
+from datetime import datetime
+import argparse
+import base64
+import json
+import os
+import statistics
+import time
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.fhir_builder import attachment_json, finalize_report, stemi_observation_json, stemi_report_json
+from app.models import _json_serializer
+
+REPORT_TEXT = "Atrial Fibrillation: 91.00%<br><br>Acute STEMI: 70.00%"
+
+
+def sample_payloads():
+    """產生固定大小的代表性資料"""
+    raw_out = {"AFIB": 0.91, "STEMI": 0.7}
+    obs = stemi_observation_json(raw_out, 0.7, 70.0, REPORT_TEXT)
+    dr = stemi_report_json()
+    dr["basedOn"] = [
+        {"identifier": {"system": "http://cmuh.org.tw/ecg", "value": "ECG0001"}},
+        {"reference": "ServiceRequest/1"},
+    ]
+    attachments = [
+        attachment_json("image/png", base64.b64encode(os.urandom(110_000)).decode(), "full"),
+        attachment_json("image/png", base64.b64encode(os.urandom(4_000)).decode(), "thumbnail"),
+    ]
+    finalize_report(dr, obs, attachments, datetime(2024, 1, 1, 8, 0, 0))
+    dr["id"] = "1"
+
+    sr_body = json.dumps(
+        {
+            "resourceType": "ServiceRequest",
+            "status": "active",
+            "intent": "order",
+            "contained": [
+                {
+                    "resourceType": "Binary",
+                    "id": "ecg",
+                    "contentType": "application/xml",
+                    "data": base64.b64encode(os.urandom(1_500_000)).decode(),
+                }
+            ],
+            "supportingInfo": [{"reference": "#ecg"}],
+        }
+    ).encode()
+    return sr_body, dr, obs
+
+
+def timed(func, repeat):
+    func()
+    samples = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started_at)
+    return statistics.median(samples) * 1000
+
+
+def run(repeat=20):
+    sr_body, dr, obs = sample_payloads()
+    cases = [
+        (
+            "POST /STEMI/ 請求解析",
+            lambda: json.loads(sr_body),
+            lambda: orjson.loads(sr_body),
+        ),
+        (
+            "GET /STEMI/{id} 回應",
+            # FastAPI 預設：jsonable_encoder 走訪後再以 stdlib json 輸出
+            lambda: JSONResponse(jsonable_encoder(dr)).body,
+            lambda: ORJSONResponse(dr).body,
+        ),
+        (
+            "Resources.result 欄位",
+            lambda: json.dumps(obs, ensure_ascii=False),
+            lambda: _json_serializer(obs),
+        ),
+    ]
+    results = []
+    for name, before, after in cases:
+        before_ms = timed(before, repeat)
+        after_ms = timed(after, repeat)
+        results.append((name, before_ms, after_ms))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API 序列化基準測試")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'項目':<24}{'json (ms)':>12}{'orjson (ms)':>14}{'倍數':>8}")
+    for name, before_ms, after_ms in run(args.repeat):
+        print(f"{name:<24}{before_ms:>12.3f}{after_ms:>14.3f}{before_ms / after_ms:>8.1f}x")